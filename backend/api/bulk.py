@@ -0,0 +1,360 @@
+"""Массовый импорт и экспорт рецептов в NDJSON и CSV.
+
+Запись рецепта:
+    {"name": "...", "text": "...", "cooking_time": 30,
+     "author": "username", "image": "recipes/photo.jpg",
+     "tags": ["breakfast"],
+     "ingredients": [{"name": "соль", "measurement_unit": "г",
+                      "amount": 5}]}
+
+В CSV теги перечисляются через запятую, а ингредиенты передаются
+JSON-массивом в одной колонке.
+"""
+import csv
+import json
+import os
+from collections import Counter
+from itertools import chain, islice
+from urllib.parse import unquote, urlparse
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import SuspiciousFileOperation, ValidationError
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.validators import validate_image_file_extension
+from django.db import transaction
+from django.db.models import F
+
+from api.cache import RECIPES, bump_catalogue_version, get_tag_catalogue
+from api.streaming import in_thread
+from community.feeds import fan_out
+from foodgram_backend import constants
+from recipes.models import Ingredient, Recipe, RecipeIngredient
+
+User = get_user_model()
+
+CSV_FIELDS = (
+    'name', 'text', 'cooking_time', 'author', 'image', 'tags', 'ingredients'
+)
+
+
+def text(data, key):
+    return str(data.get(key) or '').strip()
+
+
+def batches(items, batch_size):
+    items = iter(items)
+    while batch := list(islice(items, batch_size)):
+        yield batch
+
+
+def read_records(lines, format):
+    """Разобрать строки NDJSON или CSV в пары (номер строки, запись).
+
+    Вместо записи для нечитаемой строки возвращается текст ошибки.
+    """
+    if format == 'csv':
+        reader = csv.DictReader(lines)
+        for row in reader:
+            try:
+                yield reader.line_num, {
+                    **row,
+                    'tags': [
+                        slug.strip()
+                        for slug in (row.get('tags') or '').split(',')
+                        if slug.strip()
+                    ],
+                    'ingredients': json.loads(row.get('ingredients') or '[]'),
+                }
+            except ValueError:
+                yield reader.line_num, 'ingredients: некорректный JSON'
+        return
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield number, 'некорректный JSON'
+            continue
+        if not isinstance(record, dict):
+            yield number, 'ожидается JSON-объект'
+            continue
+        yield number, record
+
+
+def record_to_csv_row(record):
+    return {
+        **record,
+        'tags': ','.join(record['tags']),
+        'ingredients': json.dumps(record['ingredients'], ensure_ascii=False),
+    }
+
+
+def export_batches(batch_size=constants.RECIPE_BULK_BATCH_SIZE):
+    """Записи всех рецептов пачками по id без OFFSET."""
+    last_id = 0
+    while True:
+        recipes = list(
+            Recipe.objects.filter(id__gt=last_id)
+            .order_by('id')
+            .select_related('author')
+            .prefetch_related('tags', 'recipe_ingredients__ingredient')
+            [:batch_size]
+        )
+        if not recipes:
+            return
+        yield [
+            {
+                'name': recipe.name,
+                'text': recipe.text,
+                'cooking_time': recipe.cooking_time,
+                'author': recipe.author.username,
+                'image': recipe.image.name,
+                'tags': [tag.slug for tag in recipe.tags.all()],
+                'ingredients': [
+                    {
+                        'name': recipe_ingredient.ingredient.name,
+                        'measurement_unit': (
+                            recipe_ingredient.ingredient.measurement_unit
+                        ),
+                        'amount': recipe_ingredient.amount,
+                    }
+                    for recipe_ingredient in recipe.recipe_ingredients.all()
+                ],
+            }
+            for recipe in recipes
+        ]
+        last_id = recipes[-1].id
+
+
+def export_records(batch_size=constants.RECIPE_BULK_BATCH_SIZE):
+    """Записи всех рецептов для потокового ответа."""
+    return chain.from_iterable(in_thread(export_batches(batch_size)))
+
+
+class RecipeImporter:
+    """Импорт рецептов пачками: одна транзакция и bulk_create на пачку.
+
+    Названия рецептов уникальны: рецепт, название которого уже есть у
+    того же автора, пропускается, а у другого автора — попадает в errors.
+    Записи с ошибками не прерывают импорт. Изображение
+    задается именем файла в хранилище медиа; пути к локальным файлам
+    (абсолютные или file://) разрешены только при allow_local_files,
+    такие файлы копируются в хранилище.
+    """
+
+    def __init__(self, batch_size=constants.RECIPE_BULK_BATCH_SIZE,
+                 allow_local_files=False):
+        self.batch_size = batch_size
+        self.allow_local_files = allow_local_files
+        self.processed = 0
+        self.created = 0
+        self.skipped = 0
+        self.errors = []
+        self.seen_names = {}
+
+    @property
+    def result(self):
+        return {
+            'processed': self.processed,
+            'created': self.created,
+            'skipped': self.skipped,
+            'failed': len(self.errors),
+            'errors': sorted(
+                self.errors, key=lambda error: error['line']
+            )[:constants.RECIPE_IMPORT_MAX_ERRORS],
+        }
+
+    def run(self, records):
+        for batch in batches(records, self.batch_size):
+            self.import_batch(batch)
+        return self.result
+
+    def import_batch(self, batch):
+        self.processed += len(batch)
+        records = []
+        for number, record in batch:
+            if isinstance(record, str):
+                self.errors.append({'line': number, 'errors': [record]})
+            else:
+                records.append((number, record))
+
+        authors = dict(
+            User.objects.filter(
+                username__in={
+                    text(record, 'author') for _, record in records
+                }
+            ).values_list('username', 'id')
+        )
+        existing = dict(
+            Recipe.objects.filter(
+                name__in=[text(record, 'name') for _, record in records]
+            ).values_list('name', 'author_id')
+        )
+        ingredient_names = {
+            text(item, 'name')
+            for _, record in records
+            for item in record.get('ingredients') or ()
+            if isinstance(item, dict)
+        }
+        ingredients = {
+            (name, unit): ingredient_id
+            for ingredient_id, name, unit in Ingredient.objects.filter(
+                name__in=ingredient_names
+            ).values_list('id', 'name', 'measurement_unit')
+        }
+        tags = get_tag_catalogue().ids_by_slug
+
+        cleaned = []
+        for number, record in records:
+            name = text(record, 'name')
+            owner_id = existing.get(name, self.seen_names.get(name))
+            if owner_id is not None:
+                if owner_id == authors.get(text(record, 'author')):
+                    self.skipped += 1
+                else:
+                    self.errors.append({'line': number, 'errors': [
+                        'name: рецепт с таким названием есть у другого автора'
+                    ]})
+                continue
+            errors = []
+            data = self.clean_record(
+                record, authors, ingredients, tags, errors
+            )
+            if errors:
+                self.errors.append({'line': number, 'errors': errors})
+                continue
+            self.seen_names[name] = data['recipe'].author_id
+            cleaned.append(data)
+
+        if cleaned:
+            with transaction.atomic():
+                self.insert(cleaned)
+            bump_catalogue_version(RECIPES)
+            self.created += len(cleaned)
+
+    def clean_record(self, record, authors, ingredients, tags, errors):
+        name = text(record, 'name')
+        if not name or len(name) > constants.RECIPE_NAME_MAX_LENGTH:
+            errors.append('name: некорректное название')
+        description = text(record, 'text')
+        if not description:
+            errors.append('text: пустое описание')
+        try:
+            cooking_time = int(record.get('cooking_time'))
+        except (TypeError, ValueError):
+            cooking_time = None
+        if cooking_time is None or not (
+            constants.COOKING_TIME_MIN
+            <= cooking_time <= constants.COOKING_TIME_MAX
+        ):
+            errors.append('cooking_time: некорректное значение')
+        author_id = authors.get(text(record, 'author'))
+        if author_id is None:
+            errors.append(f'author: {record.get("author")!r} не найден')
+
+        tag_slugs = record.get('tags') or []
+        if not isinstance(tag_slugs, list):
+            tag_slugs = [tag_slugs]
+        tag_ids = [tags.get(str(slug)) for slug in tag_slugs]
+        if not tag_slugs or None in tag_ids or len(set(tag_ids)) != len(
+            tag_ids
+        ):
+            errors.append(f'tags: некорректный список {tag_slugs!r}')
+
+        amounts = {}
+        for item in record.get('ingredients') or ():
+            if not isinstance(item, dict):
+                errors.append('ingredients: ожидается объект')
+                continue
+            key = (text(item, 'name'), text(item, 'measurement_unit'))
+            try:
+                amount = int(item.get('amount'))
+            except (TypeError, ValueError):
+                amount = None
+            if key not in ingredients:
+                errors.append(f'ingredients: {key[0]}, {key[1]} не найден')
+            elif amount is None or not (
+                constants.AMOUNT_MIN <= amount <= constants.AMOUNT_MAX
+            ):
+                errors.append(f'ingredients: некорректное количество {key[0]}')
+            elif ingredients[key] in amounts:
+                errors.append(f'ingredients: {key[0]} повторяется')
+            else:
+                amounts[ingredients[key]] = amount
+        if not amounts and not errors:
+            errors.append('ingredients: пустой список')
+
+        if errors:
+            return None
+        image = self.resolve_image(text(record, 'image'), errors)
+        return {
+            'recipe': Recipe(
+                name=name,
+                text=description,
+                cooking_time=cooking_time,
+                author_id=author_id,
+                image=image,
+                ingredients_count=len(amounts),
+            ),
+            'tag_ids': tag_ids,
+            'amounts': amounts,
+        }
+
+    def resolve_image(self, value, errors):
+        """Имя изображения в хранилище, при необходимости после копирования."""
+        path = None
+        if value.startswith('file://'):
+            path = unquote(urlparse(value).path)
+        elif os.path.isabs(value):
+            path = value
+        try:
+            if path is None:
+                validate_image_file_extension(File(None, value))
+                if not value or not default_storage.exists(value):
+                    raise FileNotFoundError
+                return value
+            if not self.allow_local_files:
+                errors.append('image: локальные файлы запрещены')
+                return None
+            with open(path, 'rb') as image:
+                validate_image_file_extension(image)
+                return default_storage.save(
+                    f'recipes/{os.path.basename(path)}', File(image)
+                )
+        except (OSError, SuspiciousFileOperation):
+            errors.append(f'image: файл {value!r} не найден')
+        except ValidationError as error:
+            errors.append(f'image: {"; ".join(error.messages)}')
+
+    def insert(self, cleaned):
+        recipes = Recipe.objects.bulk_create(
+            data['recipe'] for data in cleaned
+        )
+
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
+                recipe=recipe, ingredient_id=ingredient_id, amount=amount,
+            )
+            for recipe, data in zip(recipes, cleaned)
+            for ingredient_id, amount in data['amounts'].items()
+        )
+        recipe_tags = Recipe.tags.through
+        recipe_tags.objects.bulk_create(
+            recipe_tags(recipe_id=recipe.pk, tag_id=tag_id)
+            for recipe, data in zip(recipes, cleaned)
+            for tag_id in data['tag_ids']
+        )
+        Recipe.objects.filter(
+            pk__in=[recipe.pk for recipe in recipes]
+        ).update_search_vector()
+        # bulk_create не отправляет сигналы, счетчик рецептов авторов
+        # и ленты подписчиков обновляются здесь.
+        fan_out(recipes)
+        for author_id, count in Counter(
+            recipe.author_id for recipe in recipes
+        ).items():
+            User.objects.filter(pk=author_id).update(
+                recipes_count=F('recipes_count') + count
+            )
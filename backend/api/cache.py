@@ -0,0 +1,204 @@
+from bisect import bisect_left
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.db import transaction
+from django.http import Http404
+
+from api.streaming import in_thread
+from community.models import ShoppingCart, ShortLink
+from foodgram_backend.constants import (
+    INGREDIENT_CATALOGUE_MAX_SIZE, INGREDIENT_SEARCH_LIMIT,
+    INGREDIENT_SUBSTRING_SEARCH_MIN_LENGTH, SHOPPING_LIST_CACHE_MAX_ROWS,
+    SHOPPING_LIST_CACHE_TIMEOUT, SHORT_LINK_CACHE_TIMEOUT
+)
+from recipes.models import Ingredient, Tag
+
+SHOPPING_CART = 'shopping_cart'
+FAVORITES = 'favorites'
+FOLLOWS = 'follows'
+TAGS = 'tags'
+INGREDIENTS = 'ingredients'
+RECIPES = 'recipes'
+USERS = 'users'
+POPULARITY = 'popularity'
+
+_catalogues = {}
+
+
+def _get_version(key):
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+def _bump_versions(*keys):
+    """Сменить версии keys после фиксации транзакции.
+
+    Иначе запрос, пришедший до фиксации, закэшировал бы старые данные
+    (или вычислил бы по ним ETag) под новой версией.
+    """
+    version = uuid4().hex
+    transaction.on_commit(
+        lambda: cache.set_many({key: version for key in keys}, None)
+    )
+
+
+def _user_version_key(name, user_id):
+    return f'{name}_version:{user_id}'
+
+
+def get_user_version(name, user_id):
+    """Текущая версия пользовательских данных (например, корзины)."""
+    return _get_version(_user_version_key(name, user_id))
+
+
+def bump_user_version(name, *user_ids):
+    """Сменить версию данных пользователей, сделав устаревшим их кэш."""
+    _bump_versions(
+        *(_user_version_key(name, user_id) for user_id in user_ids)
+    )
+
+
+def get_catalogue_version(name):
+    """Общая для всех воркеров версия справочника (тегов, ингредиентов)."""
+    return _get_version(f'catalogue_version:{name}')
+
+
+def bump_catalogue_version(name):
+    _bump_versions(f'catalogue_version:{name}')
+
+
+def invalidate_shopping_lists(recipes):
+    """Сменить версию корзин, в которых лежат рецепты recipes."""
+    bump_user_version(SHOPPING_CART, *ShoppingCart.objects.filter(
+        recipe__in=recipes
+    ).values_list('user_id', flat=True).distinct())
+
+
+def get_shopping_list(user, ingredients):
+    """Агрегированный список покупок из кэша текущей версии корзины.
+
+    Без кэша строки отдаются по мере чтения из базы в отдельном потоке
+    (см. in_thread). В кэш попадает только список не длиннее
+    SHOPPING_LIST_CACHE_MAX_ROWS строк.
+    """
+    version = get_user_version(SHOPPING_CART, user.id)
+    key = f'shopping_list:{user.id}:{version}'
+    shopping_list = cache.get(key)
+    if shopping_list is not None:
+        yield from shopping_list
+        return
+    rows = []
+    for row in in_thread(ingredients.iterator()):
+        if rows is not None:
+            rows.append(row)
+            if len(rows) > SHOPPING_LIST_CACHE_MAX_ROWS:
+                rows = None
+        yield row
+    if rows is not None:
+        cache.set(key, rows, SHOPPING_LIST_CACHE_TIMEOUT)
+
+
+def _short_link_key(code):
+    return f'short_link:{code}'
+
+
+def get_short_link_recipe_id(code):
+    """id рецепта по коду короткой ссылки, сначала из кэша."""
+    recipe_id = cache.get(_short_link_key(code))
+    if recipe_id is None:
+        recipe_id = ShortLink.objects.filter(code=code).values_list(
+            'recipe_id', flat=True
+        ).first()
+        if recipe_id is None:
+            raise Http404
+        cache.set(_short_link_key(code), recipe_id, SHORT_LINK_CACHE_TIMEOUT)
+    return recipe_id
+
+
+def forget_short_link(code):
+    cache.delete(_short_link_key(code))
+
+
+class TagCatalogue:
+    """Неизменяемый снимок всех тегов."""
+
+    def __init__(self, version):
+        self.version = version
+        self.rows = tuple(
+            Tag.objects.order_by('id').values_list('id', 'name', 'slug')
+        )
+        self.ids_by_slug = {slug: tag_id for tag_id, _, slug in self.rows}
+
+    def as_list(self):
+        return [
+            {'id': tag_id, 'name': name, 'slug': slug}
+            for tag_id, name, slug in self.rows
+        ]
+
+
+class IngredientCatalogue:
+    """Неизменяемый снимок ингредиентов, отсортированных по UPPER(name).
+
+    Поиск по началу названия идет бинарным поиском по массиву ключей.
+    Справочник больше INGREDIENT_CATALOGUE_MAX_SIZE в память не
+    загружается (rows is None), такие запросы обслуживает база.
+    """
+
+    def __init__(self, version):
+        self.version = version
+        rows = list(
+            Ingredient.objects.values_list('id', 'name', 'measurement_unit')
+            [:INGREDIENT_CATALOGUE_MAX_SIZE + 1]
+        )
+        if len(rows) > INGREDIENT_CATALOGUE_MAX_SIZE:
+            self.rows = self.keys = None
+            return
+        rows.sort(key=lambda row: (row[1].upper(), row[0]))
+        self.rows = tuple(rows)
+        self.keys = tuple(name.upper() for _, name, _ in rows)
+
+    def as_list(self, rows=None):
+        return [
+            {'id': ingredient_id, 'name': name, 'measurement_unit': unit}
+            for ingredient_id, name, unit in (
+                self.rows if rows is None else rows
+            )
+        ]
+
+    def search(self, value, limit=INGREDIENT_SEARCH_LIMIT):
+        """Сначала совпадения по началу названия, затем по подстроке."""
+        value = value.upper()
+        start = end = bisect_left(self.keys, value)
+        while (
+            end < len(self.keys) and end - start < limit
+            and self.keys[end].startswith(value)
+        ):
+            end += 1
+        found = list(range(start, end))
+        if len(value) >= INGREDIENT_SUBSTRING_SEARCH_MIN_LENGTH:
+            for index, key in enumerate(self.keys):
+                if len(found) >= limit:
+                    break
+                if value in key and not key.startswith(value):
+                    found.append(index)
+        return self.as_list(self.rows[index] for index in found)
+
+
+def _get_catalogue(name, catalogue_class):
+    version = get_catalogue_version(name)
+    catalogue = _catalogues.get(name)
+    if catalogue is None or catalogue.version != version:
+        catalogue = _catalogues[name] = catalogue_class(version)
+    return catalogue
+
+
+def get_tag_catalogue():
+    return _get_catalogue(TAGS, TagCatalogue)
+
+
+def get_ingredient_catalogue():
+    return _get_catalogue(INGREDIENTS, IngredientCatalogue)
@@ -0,0 +1,103 @@
+"""Условные GET-запросы: ETag и Last-Modified без сериализации ответа."""
+from hashlib import md5
+
+from django.utils.cache import (
+    get_conditional_response, patch_cache_control, patch_vary_headers
+)
+from django.utils.http import http_date, quote_etag
+
+from api.cache import (
+    FAVORITES, FOLLOWS, SHOPPING_CART, get_catalogue_version,
+    get_user_version
+)
+
+VIEWER_VERSIONS = (FAVORITES, SHOPPING_CART, FOLLOWS)
+
+
+def make_etag(*parts):
+    return quote_etag(md5(repr(parts).encode()).hexdigest())
+
+
+def get_viewer_versions(user):
+    """Версии данных пользователя, от которых зависят флаги в ответах:
+    is_favorited, is_in_shopping_cart, is_subscribed.
+    """
+    if not user.is_authenticated:
+        return ('anonymous',)
+    return (user.id, *(
+        get_user_version(name, user.id) for name in VIEWER_VERSIONS
+    ))
+
+
+class ConditionalGetMixin:
+    """list и retrieve с валидаторами кэша.
+
+    ETag списка собирается из версий кэша (list_catalogues), ETag
+    объекта — из столбцов last_modified_fields, прочитанных одним
+    запросом по первичному ключу. К обоим добавляются путь с
+    параметрами, формат ответа и версии данных пользователя. Если
+    валидатор совпал, ответ 304 отдается без выборки данных и
+    сериализатора. Last-Modified отдается только анонимным
+    пользователям: у авторизованных ответ зависит и от их избранного,
+    корзины и подписок, которые дата изменения объекта не отражает.
+    """
+
+    list_catalogues = ()
+    last_modified_fields = ('updated_at',)
+
+    def get_list_catalogues(self):
+        return self.list_catalogues
+
+    def get_object_pk(self):
+        return self.kwargs[self.lookup_url_kwarg or self.lookup_field]
+
+    def list(self, request, *args, **kwargs):
+        etag_parts = tuple(
+            get_catalogue_version(name)
+            for name in self.get_list_catalogues()
+        )
+        return self.conditional_response(
+            super().list, etag_parts, None, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            values = self.queryset.filter(
+                pk=self.get_object_pk()
+            ).values_list(*self.last_modified_fields).first()
+        except (TypeError, ValueError):
+            values = None
+        if values is None:
+            return super().retrieve(request, *args, **kwargs)
+        return self.conditional_response(
+            super().retrieve, values, max(values), request, *args, **kwargs
+        )
+
+    def conditional_response(self, view, etag_parts, last_modified,
+                             request, *args, **kwargs):
+        user = request.user
+        etag = make_etag(
+            request.get_full_path(),
+            request.accepted_renderer.format,
+            *get_viewer_versions(user),
+            *etag_parts,
+        )
+        timestamp = None
+        if last_modified is not None and not user.is_authenticated:
+            timestamp = int(last_modified.timestamp())
+        response = get_conditional_response(
+            request, etag=etag, last_modified=timestamp
+        )
+        if response is None:
+            response = view(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+        response['ETag'] = etag
+        if timestamp is not None:
+            response['Last-Modified'] = http_date(timestamp)
+        if user.is_authenticated:
+            patch_cache_control(response, private=True, no_cache=True)
+        else:
+            patch_cache_control(response, public=True, no_cache=True)
+        patch_vary_headers(response, ('Accept', 'Authorization'))
+        return response
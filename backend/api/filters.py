@@ -1,38 +1,136 @@
 import django_filters
+from django import forms
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import (
+    Case, Exists, F, IntegerField, OuterRef, Value, When
+)
+from django_filters.constants import EMPTY_VALUES
 from django_filters.rest_framework import CharFilter, FilterSet
 
+from api.cache import get_tag_catalogue
+from foodgram_backend.constants import (
+    INGREDIENT_SEARCH_LIMIT, INGREDIENT_SUBSTRING_SEARCH_MIN_LENGTH,
+    RECIPE_SEARCH_CONFIG
+)
 from recipes.models import Ingredient, Recipe
 
 
 class IngredientFilter(FilterSet):
-    name = CharFilter(
-        field_name='name',
-        lookup_expr='istartswith'
-    )
+    name = CharFilter(method='filter_name')
 
     class Meta:
         model = Ingredient
         fields = ('name',)
         ordering = ('name',)
 
+    def filter_name(self, queryset, name, value):
+        """Автодополнение: сначала совпадения по началу названия,
+        затем по подстроке, не более INGREDIENT_SEARCH_LIMIT результатов.
+
+        Запросы используют индексы по UPPER(name) из миграции
+        recipes.0003; поиск по подстроке включается с длины
+        INGREDIENT_SUBSTRING_SEARCH_MIN_LENGTH, когда его может обслужить
+        триграммный индекс.
+        """
+        if len(value) < INGREDIENT_SUBSTRING_SEARCH_MIN_LENGTH:
+            return queryset.filter(
+                name__istartswith=value
+            ).order_by('name')[:INGREDIENT_SEARCH_LIMIT]
+        return queryset.filter(name__icontains=value).annotate(
+            match_rank=Case(
+                When(name__istartswith=value, then=Value(0)),
+                default=Value(1),
+                output_field=IntegerField(),
+            )
+        ).order_by('match_rank', 'name')[:INGREDIENT_SEARCH_LIMIT]
+
+
+class MultipleValueField(forms.Field):
+    widget = forms.MultipleHiddenInput
+
+
+class TagSlugsFilter(django_filters.Filter):
+    """Рецепты хотя бы с одним из тегов (?tags=a&tags=b).
+
+    Слаги переводятся в id по кэшу тегов, фильтр строится как EXISTS
+    по промежуточной таблице и не дублирует рецепты.
+    """
+
+    field_class = MultipleValueField
+
+    def filter(self, qs, value):
+        if value in EMPTY_VALUES:
+            return qs
+        ids_by_slug = get_tag_catalogue().ids_by_slug
+        tag_ids = {ids_by_slug[slug] for slug in value if slug in ids_by_slug}
+        if not tag_ids:
+            return qs.none()
+        return qs.filter(Exists(
+            Recipe.tags.through.objects.filter(
+                recipe_id=OuterRef('pk'),
+                tag_id__in=tag_ids,
+            )
+        ))
+
+
+RECIPE_ORDERINGS = {
+    'newest': ('-created_at', '-id'),
+    'popular': ('-popularity', '-id'),
+    'trending': ('-trending_score', '-id'),
+}
+
 
 class RecipeFilter(FilterSet):
-    tags = django_filters.AllValuesMultipleFilter(
-        field_name='tags__slug',
-        lookup_expr='icontains',
-    )
+    tags = TagSlugsFilter()
     is_in_shopping_cart = django_filters.NumberFilter(
         method='get_is_in_shopping_cart',
     )
     is_favorited = django_filters.NumberFilter(
         method='get_is_favorited',
     )
+    search = CharFilter(method='filter_search')
+    ordering = django_filters.ChoiceFilter(
+        choices=(
+            ('newest', 'Сначала новые'),
+            ('popular', 'Популярные'),
+            ('trending', 'Популярные за последнее время'),
+        ),
+        method='filter_ordering',
+    )
 
     class Meta:
         model = Recipe
-        fields = ('author', 'tags', 'is_in_shopping_cart', 'is_favorited')
+        fields = (
+            'author', 'tags', 'is_in_shopping_cart', 'is_favorited',
+            'search', 'ordering',
+        )
         ordering = ('-created_at',)
 
+    def filter_ordering(self, queryset, name, value):
+        """Порядок по индексам (-popularity, -id) и (-trending_score, -id).
+
+        Популярность — взвешенная сумма добавлений в избранное и
+        корзину; trending_score дополнительно затухает с возрастом
+        рецепта (см. recipes.models.get_trending_score).
+        """
+        return queryset.order_by(*RECIPE_ORDERINGS[value])
+
+    def filter_search(self, queryset, name, value):
+        """Полнотекстовый поиск по названию, описанию и ингредиентам.
+
+        Запрос разбирается как websearch_to_tsquery и сопоставляется с
+        search_vector по GIN-индексу, результаты упорядочены по ts_rank.
+        """
+        value = value.strip()
+        if not value:
+            return queryset
+        query = SearchQuery(
+            value, config=RECIPE_SEARCH_CONFIG, search_type='websearch'
+        )
+        return queryset.filter(search_vector=query).annotate(
+            search_rank=SearchRank(F('search_vector'), query)
+        ).order_by('-search_rank', '-created_at', '-id')
+
     def get_is_in_shopping_cart(self, queryset, name, value):
         if self.request.user.is_authenticated and value:
             return queryset.filter(
@@ -0,0 +1,178 @@
+import io
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import django
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image, ImageOps, features
+
+from api.cache import RECIPES, USERS, bump_catalogue_version
+from foodgram_backend.constants import (
+    IMAGE_VARIANT_QUALITY, IMAGE_VARIANTS_DIR
+)
+
+logger = logging.getLogger('foodgram.images')
+
+VARIANT_FORMAT, VARIANT_EXTENSION = (
+    ('WEBP', 'webp') if features.check('webp') else ('JPEG', 'jpg')
+)
+
+# Версии кэша, от которых зависят ETag списков с изображениями модели.
+MODEL_CATALOGUES = {'recipes.Recipe': RECIPES, 'users.User': USERS}
+
+_executor = None
+
+
+def variants_field_name(field_name):
+    """Поле модели с вариантами изображения: image -> image_variants."""
+    return f'{field_name}_variants'
+
+
+def get_variants(file):
+    """Готовые варианты изображения: {ширина: имя файла}.
+
+    Варианты хранятся в поле {field}_variants модели в виде
+    {'source': имя оригинала, 'files': {ширина: имя файла}} и
+    используются, только пока оригинал не заменен. Если оригинал уже
+    некоторых из запрошенных ширин, в поле есть и 'width' — ширина оригинала,
+    который тогда заменяет недостающие варианты.
+    """
+    variants = getattr(file.instance, variants_field_name(file.field.name))
+    if not variants or variants.get('source') != file.name:
+        return {}
+    files = {int(width): name for width, name in variants['files'].items()}
+    if 'width' in variants:
+        files[variants['width']] = file.name
+    return files
+
+
+def get_variant_name(file, width=None):
+    """Имя наименьшего варианта не уже width или оригинала, если их нет.
+
+    Без width возвращается самый крупный вариант.
+    """
+    variants = get_variants(file)
+    if not variants:
+        return file.name
+    widths = sorted(variants)
+    if width is not None:
+        for variant_width in widths:
+            if variant_width >= width:
+                return variants[variant_width]
+    return variants[widths[-1]]
+
+
+def render_variants(source, widths):
+    """Уменьшить изображение до каждой ширины из widths и перекодировать.
+
+    Ширины не меньше ширины оригинала пропускаются: thumbnail() не
+    увеличивает изображение. Возвращает {фактическая ширина: имя файла}
+    и ширину оригинала.
+    """
+    with default_storage.open(source) as source_file:
+        image = ImageOps.exif_transpose(Image.open(source_file))
+        image.load()
+    if VARIANT_FORMAT == 'JPEG' or image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGB')
+    files = {}
+    for width in sorted(widths):
+        if width >= image.width:
+            break
+        variant = image.copy()
+        variant.thumbnail((width, image.height))
+        buffer = io.BytesIO()
+        variant.save(buffer, VARIANT_FORMAT, quality=IMAGE_VARIANT_QUALITY)
+        name = (
+            f'{IMAGE_VARIANTS_DIR}/{os.path.splitext(source)[0]}'
+            f'_{width}.{VARIANT_EXTENSION}'
+        )
+        default_storage.delete(name)
+        files[str(variant.width)] = default_storage.save(
+            name, ContentFile(buffer.getvalue())
+        )
+    return files, image.width
+
+
+def delete_variants(variants, keep=()):
+    for name in (variants or {}).get('files', {}).values():
+        if name not in keep:
+            default_storage.delete(name)
+
+
+def process_image(model_label, pk, field_name, source, widths):
+    """Создать варианты изображения и сохранить их имена в модели.
+
+    Выполняется в процессе пула. Если за это время изображение
+    заменили, созданные файлы удаляются.
+    """
+    model = apps.get_model(model_label)
+    variants_field = variants_field_name(field_name)
+    files, width = render_variants(source, widths)
+    variants = {'source': source, 'files': files}
+    if len(files) < len(widths):
+        variants['width'] = width
+    previous = model.objects.filter(pk=pk).values_list(
+        variants_field, flat=True
+    ).first()
+    updated = model.objects.filter(pk=pk, **{field_name: source}).update(
+        **{variants_field: variants}, updated_at=timezone.now(),
+    )
+    if not updated:
+        delete_variants({'files': files})
+        return
+    delete_variants(previous, keep=files.values())
+    bump_catalogue_version(MODEL_CATALOGUES[model_label])
+    logger.info('%s %s: варианты %s готовы', model_label, pk, source)
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        # spawn: дочерние процессы не наследуют потоки и соединения
+        # с базой воркера gunicorn.
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.IMAGE_PROCESSING_WORKERS,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=django.setup,
+        )
+    return _executor
+
+
+def _log_failure(future):
+    if future.exception():
+        logger.error(
+            'Ошибка обработки изображения', exc_info=future.exception()
+        )
+
+
+def _submit(*args):
+    global _executor
+    if not settings.IMAGE_PROCESSING_WORKERS:
+        try:
+            process_image(*args)
+        except Exception:
+            logger.exception('Ошибка обработки изображения')
+        return
+    try:
+        future = _get_executor().submit(process_image, *args)
+    except BrokenProcessPool:
+        _executor = None
+        future = _get_executor().submit(process_image, *args)
+    future.add_done_callback(_log_failure)
+
+
+def schedule_image_variants(instance, field_name, widths):
+    """Поставить в очередь обработку изображения после коммита."""
+    source = getattr(instance, field_name).name
+    if not source:
+        return
+    args = (instance._meta.label, instance.pk, field_name, source, widths)
+    transaction.on_commit(lambda: _submit(*args))
@@ -0,0 +1,317 @@
+import json
+import math
+import platform
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from http import HTTPStatus
+from pathlib import Path
+
+import django
+import requests
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from rest_framework.authtoken.models import Token
+
+from api.profiling import QueryProfile
+from foodgram_backend.constants import BENCHMARK_ITERATIONS
+from recipes.models import Ingredient, Recipe, Tag
+
+User = get_user_model()
+
+
+def percentile(values, fraction):
+    """Перцентиль по методу ближайшего ранга."""
+    ordered = sorted(values)
+    return ordered[max(math.ceil(fraction * len(ordered)) - 1, 0)]
+
+
+class Command(BaseCommand):
+    """Замеры задержек и числа запросов горячих эндпоинтов API."""
+
+    help = (
+        'Прогоняет сценарии API через тестовый клиент Django и пишет '
+        'перцентили задержек и число SQL-запросов в JSON. Данные для '
+        'замеров создает команда generate_data.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--iterations', type=int, default=BENCHMARK_ITERATIONS,
+        )
+        parser.add_argument(
+            '--warmup', type=int, default=3,
+            help='Число прогонов каждого сценария без учета в результатах.',
+        )
+        parser.add_argument(
+            '--user',
+            help=(
+                'Имя пользователя для сценариев с авторизацией. По '
+                'умолчанию пользователь с наибольшим числом подписок.'
+            ),
+        )
+        parser.add_argument(
+            '--scenario',
+            action='append',
+            help='Запустить только указанные сценарии.',
+        )
+        parser.add_argument(
+            '--url',
+            help=(
+                'Адрес запущенного сервера, например http://127.0.0.1:8000. '
+                'Без него запросы идут через тестовый клиент Django.'
+            ),
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=1,
+            help='Число параллельных клиентов, только вместе с --url.',
+        )
+        parser.add_argument(
+            '--output', help='Файл для результатов в JSON.',
+        )
+        parser.add_argument(
+            '--compare', help='JSON предыдущего прогона для сравнения.',
+        )
+
+    def handle(self, *args, **options):
+        if options['concurrency'] > 1 and not options['url']:
+            raise CommandError('--concurrency требует --url')
+        user = self.get_user(options['user'])
+        scenarios = self.get_scenarios()
+        if options['scenario']:
+            unknown = set(options['scenario']) - set(scenarios)
+            if unknown:
+                raise CommandError(
+                    f'Неизвестные сценарии: {", ".join(sorted(unknown))}. '
+                    f'Доступны: {", ".join(scenarios)}'
+                )
+            scenarios = {
+                name: scenarios[name] for name in options['scenario']
+            }
+
+        token = Token.objects.get_or_create(user=user)[0].key
+        if options['url']:
+            anonymous = self.live_fetcher(options['url'])
+            authorized = self.live_fetcher(options['url'], token)
+        else:
+            anonymous = self.test_client_fetcher()
+            authorized = self.test_client_fetcher(token)
+        results = {}
+        for name, (url, needs_auth) in scenarios.items():
+            results[name] = self.run_scenario(
+                authorized if needs_auth else anonymous, url,
+                options['iterations'], options['warmup'],
+                options['concurrency'], profile_queries=not options['url'],
+            )
+            style = (
+                str if results[name]['status'] == HTTPStatus.OK
+                else self.style.WARNING
+            )
+            self.stdout.write(style(self.format_result(name, results[name])))
+
+        report = {
+            'meta': self.get_meta(user, options),
+            'results': results,
+        }
+        if options['output']:
+            Path(options['output']).write_text(
+                json.dumps(report, ensure_ascii=False, indent=2),
+                encoding='UTF-8',
+            )
+        if options['compare']:
+            self.compare(results, options['compare'])
+
+    def get_host(self):
+        """Первый хост из ALLOWED_HOSTS, пригодный для заголовка Host."""
+        for host in settings.ALLOWED_HOSTS:
+            if host and '*' not in host and not host.startswith('.'):
+                return host
+        return 'localhost'
+
+    def get_user(self, username):
+        if username:
+            user = User.objects.filter(username=username).first()
+        else:
+            user = User.objects.annotate(
+                follows=Count('follower')
+            ).order_by('-follows', 'id').first()
+        if user is None:
+            raise CommandError(
+                'Пользователь не найден, сначала запустите generate_data'
+            )
+        return user
+
+    def get_scenarios(self):
+        """Имя сценария -> (URL, нужна ли авторизация)."""
+        recipe = Recipe.objects.order_by('-favorites_count', 'id').first()
+        tag = Tag.objects.order_by('id').first()
+        ingredient = Ingredient.objects.order_by('id').first()
+        if recipe is None or tag is None or ingredient is None:
+            raise CommandError('Нет данных, сначала запустите generate_data')
+        return {
+            'recipes_list': ('/api/recipes/', False),
+            'recipes_list_authorized': ('/api/recipes/', True),
+            'recipes_list_cursor': (
+                '/api/recipes/?pagination=cursor', True
+            ),
+            'recipes_deep_page': ('/api/recipes/?page=50', False),
+            'recipes_by_tag': (f'/api/recipes/?tags={tag.slug}', True),
+            'recipes_by_author': (
+                f'/api/recipes/?author={recipe.author_id}', True
+            ),
+            'recipes_favorited': ('/api/recipes/?is_favorited=1', True),
+            'recipes_in_cart': (
+                '/api/recipes/?is_in_shopping_cart=1', True
+            ),
+            'recipe_detail': (f'/api/recipes/{recipe.id}/', True),
+            'subscriptions': (
+                '/api/users/subscriptions/?recipes_limit=3', True
+            ),
+            'users_list': ('/api/users/', True),
+            'ingredients_autocomplete': (
+                f'/api/ingredients/?name={ingredient.name[:2]}', False
+            ),
+            'shopping_list_download': (
+                '/api/recipes/download_shopping_cart/', True
+            ),
+        }
+
+    def test_client_fetcher(self, token=None):
+        headers = {'HTTP_HOST': self.get_host()}
+        if token:
+            headers['HTTP_AUTHORIZATION'] = f'Token {token}'
+        client = Client(**headers)
+
+        def fetch(url):
+            response = client.get(url)
+            # Потоковый ответ формируется при чтении, его тоже замеряем.
+            if response.streaming:
+                b''.join(response.streaming_content)
+            else:
+                response.content
+            return response.status_code
+
+        return fetch
+
+    def live_fetcher(self, base_url, token=None):
+        """Запросы к запущенному серверу, своя сессия на каждый поток."""
+        local = threading.local()
+
+        def fetch(url):
+            if not hasattr(local, 'session'):
+                local.session = requests.Session()
+                if token:
+                    local.session.headers['Authorization'] = f'Token {token}'
+            response = local.session.get(
+                base_url.rstrip('/') + url, allow_redirects=False
+            )
+            response.content
+            return response.status_code
+
+        return fetch
+
+    def timed_fetch(self, fetch, url, profile_queries):
+        profile = QueryProfile()
+        start = time.perf_counter()
+        if profile_queries:
+            with profile.capture():
+                status = fetch(url)
+        else:
+            status = fetch(url)
+        return status, (time.perf_counter() - start) * 1000, profile.queries
+
+    def run_scenario(self, fetch, url, iterations, warmup, concurrency,
+                     profile_queries):
+        for _ in range(warmup):
+            fetch(url)
+        start = time.perf_counter()
+        if concurrency > 1:
+            with ThreadPoolExecutor(concurrency) as executor:
+                samples = list(executor.map(
+                    lambda _: self.timed_fetch(fetch, url, False),
+                    range(iterations),
+                ))
+        else:
+            samples = [
+                self.timed_fetch(fetch, url, profile_queries)
+                for _ in range(iterations)
+            ]
+        elapsed = time.perf_counter() - start
+        statuses, timings, queries = zip(*samples)
+        return {
+            'url': url,
+            'status': max(statuses),
+            'iterations': iterations,
+            'concurrency': concurrency,
+            'rps': round(iterations / elapsed, 1),
+            'p50_ms': round(percentile(timings, 0.5), 2),
+            'p95_ms': round(percentile(timings, 0.95), 2),
+            'p99_ms': round(percentile(timings, 0.99), 2),
+            'mean_ms': round(statistics.mean(timings), 2),
+            'min_ms': round(min(timings), 2),
+            'max_ms': round(max(timings), 2),
+            'queries': max(queries) if profile_queries else None,
+        }
+
+    def format_result(self, name, result):
+        return (
+            f'{name:<26} {result["status"]} '
+            f'p50={result["p50_ms"]:>8.2f} мс '
+            f'p95={result["p95_ms"]:>8.2f} мс '
+            f'p99={result["p99_ms"]:>8.2f} мс '
+            f'rps={result["rps"]:>7.1f} '
+            f'запросов={result["queries"]}'
+        )
+
+    def get_meta(self, user, options):
+        return {
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'target': options['url'] or 'django.test.Client',
+            'concurrency': options['concurrency'],
+            'database': connection.vendor,
+            'cache': settings.CACHES['default']['BACKEND'],
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'user': user.username,
+            'iterations': options['iterations'],
+            'dataset': {
+                'users': User.objects.count(),
+                'recipes': Recipe.objects.count(),
+                'ingredients': Ingredient.objects.count(),
+                'tags': Tag.objects.count(),
+            },
+        }
+
+    def compare(self, results, path):
+        try:
+            baseline = json.loads(
+                Path(path).read_text(encoding='UTF-8')
+            )['results']
+        except (OSError, ValueError, KeyError) as error:
+            raise CommandError(f'Не удалось прочитать {path}: {error}')
+        self.stdout.write(f'\nСравнение с {path}:')
+        for name, result in results.items():
+            previous = baseline.get(name)
+            if previous is None:
+                continue
+            change = (
+                (result['p95_ms'] - previous['p95_ms'])
+                / previous['p95_ms'] * 100 if previous['p95_ms'] else 0
+            )
+            style = (
+                self.style.ERROR if change > 10
+                else self.style.SUCCESS if change < -10
+                else str
+            )
+            self.stdout.write(style(
+                f'{name:<26} p95 {previous["p95_ms"]:.2f} -> '
+                f'{result["p95_ms"]:.2f} мс ({change:+.1f}%), '
+                f'rps {previous.get("rps")} -> {result["rps"]}, '
+                f'запросов {previous["queries"]} -> {result["queries"]}'
+            ))
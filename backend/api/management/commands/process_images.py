@@ -0,0 +1,56 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from api.images import process_image, variants_field_name
+from foodgram_backend.constants import (
+    AVATAR_IMAGE_WIDTHS, RECIPE_IMAGE_WIDTHS
+)
+from recipes.models import Recipe
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    """Создание вариантов изображений рецептов и аватаров."""
+
+    help = (
+        'Создает уменьшенные варианты изображений, которых еще нет: '
+        'например, после импорта или загрузки через админку.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Пересоздать варианты для всех изображений.',
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        for model, field_name, widths in (
+            (Recipe, 'image', RECIPE_IMAGE_WIDTHS),
+            (User, 'avatar', AVATAR_IMAGE_WIDTHS),
+        ):
+            variants_field = variants_field_name(field_name)
+            rows = model.objects.exclude(
+                **{f'{field_name}__in': ('', None)}
+            ).values_list('pk', field_name, variants_field)
+            for pk, source, variants in rows.iterator():
+                ready = (
+                    variants and variants.get('source') == source
+                    and ('width' in variants
+                         or len(variants['files']) == len(widths))
+                )
+                if ready and not options['all']:
+                    continue
+                try:
+                    process_image(
+                        model._meta.label, pk, field_name, source, widths
+                    )
+                except (OSError, ValueError) as error:
+                    self.stderr.write(f'{source}: {error}')
+                    continue
+                total += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано изображений: {total}'
+        ))
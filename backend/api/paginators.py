@@ -1,4 +1,14 @@
-from rest_framework.pagination import PageNumberPagination
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (
+    Cursor, CursorPagination, PageNumberPagination
+)
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 
 from foodgram_backend.constants import PAGE_SIZE
 
@@ -6,3 +16,204 @@ from foodgram_backend.constants import PAGE_SIZE
 class CustomPagination(PageNumberPagination):
     page_size = PAGE_SIZE
     page_size_query_param = 'limit'
+
+
+class LimitPagination(CustomPagination):
+    """Постраничная пагинация без COUNT(*).
+
+    Следующая страница есть, если запрос вернул лишнюю строку. Ответ
+    сохраняет формат CustomPagination, count в нем всегда null.
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        page_number = request.query_params.get(self.page_query_param, 1)
+        try:
+            self.page_number = int(page_number)
+            if self.page_number < 1:
+                raise ValueError
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_page_message.format(
+                page_number=page_number, message='',
+            ))
+        self.request = request
+        offset = (self.page_number - 1) * page_size
+        results = list(queryset[offset:offset + page_size + 1])
+        self.has_next = len(results) > page_size
+        return results[:page_size]
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(), self.page_query_param,
+            self.page_number + 1,
+        )
+
+    def get_previous_link(self):
+        if self.page_number == 1:
+            return None
+        url = self.request.build_absolute_uri()
+        if self.page_number == 2:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(
+            url, self.page_query_param, self.page_number - 1
+        )
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('count', None),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+
+class KeysetPagination(CursorPagination):
+    """Курсорная пагинация по (created_at, id) без COUNT(*) и OFFSET.
+
+    В отличие от CursorPagination DRF, курсор хранит значения всех полей
+    порядка, а следующая страница выбирается условием
+    a <= a0 AND (a < a0 OR a = a0 AND b < b0). Поэтому длинные серии
+    равных значений первого поля (popularity = 0) не листаются
+    смещением, а условие a <= a0 задает начало просмотра индекса.
+    Порядок должен заканчиваться уникальным полем, view может задать его
+    атрибутом cursor_ordering. Ответ сохраняет формат CustomPagination,
+    count в нем всегда null.
+    """
+
+    page_size = PAGE_SIZE
+    page_size_query_param = 'limit'
+    ordering = ('-created_at', '-id')
+
+    def get_ordering(self, request, queryset, view):
+        return getattr(view, 'cursor_ordering', self.ordering)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        cursor = self.decode_cursor(request)
+        position = cursor and cursor.position
+        reverse = bool(cursor and cursor.reverse)
+        ordering = self.ordering
+        if reverse:
+            ordering = tuple(
+                field[1:] if field.startswith('-') else f'-{field}'
+                for field in ordering
+            )
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            values = self.decode_position(position, queryset.model)
+            queryset = queryset.filter(
+                self.get_keyset_filter(ordering, values)
+            )
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+        self.first_position = self.last_position = position
+        if self.page:
+            self.first_position = self.encode_position(self.page[0])
+            self.last_position = self.encode_position(self.page[-1])
+        return self.page
+
+    def get_keyset_filter(self, ordering, values):
+        """Условие «строка после values» для лексикографического порядка.
+
+        Дизъюнкция не годится для начала просмотра индекса, поэтому к ней
+        добавляется нестрогая граница по первому полю.
+        """
+        condition = None
+        for field, value in reversed(tuple(zip(ordering, values))):
+            name = field.lstrip('-')
+            after = Q(**{
+                f'{name}__{"lt" if field.startswith("-") else "gt"}': value
+            })
+            condition = after if condition is None else (
+                after | (Q(**{name: value}) & condition)
+            )
+        if len(ordering) > 1:
+            field = ordering[0]
+            condition &= Q(**{
+                f'{field.lstrip("-")}__'
+                f'{"lte" if field.startswith("-") else "gte"}': values[0]
+            })
+        return condition
+
+    def encode_position(self, instance):
+        return json.dumps([
+            str(
+                instance[field.lstrip('-')] if isinstance(instance, dict)
+                else getattr(instance, field.lstrip('-'))
+            )
+            for field in self.ordering
+        ])
+
+    def decode_position(self, position, model):
+        """Значения полей порядка из курсора, приведенные к типам полей."""
+        try:
+            values = json.loads(position)
+            if (
+                not isinstance(values, list)
+                or len(values) != len(self.ordering)
+                or None in values
+            ):
+                raise ValueError
+            return [
+                model._meta.get_field(field.lstrip('-')).to_python(value)
+                for field, value in zip(self.ordering, values)
+            ]
+        except (ValidationError, ValueError, TypeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(
+            Cursor(offset=0, reverse=False, position=self.last_position)
+        )
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        return self.encode_cursor(
+            Cursor(offset=0, reverse=True, position=self.first_position)
+        )
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('count', None),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+
+class FeedPagination(CustomPagination):
+    """Постраничная пагинация, с ?pagination=cursor — курсорная."""
+
+    mode_query_param = 'pagination'
+    keyset_pagination_class = KeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset_paginator = None
+        if request.query_params.get(self.mode_query_param) == 'cursor':
+            self.keyset_paginator = self.keyset_pagination_class()
+            return self.keyset_paginator.paginate_queryset(
+                queryset, request, view
+            )
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset_paginator is not None:
+            return self.keyset_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,170 @@
+import json
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger('foodgram.profiling')
+
+_current_profile = ContextVar('query_profile', default=None)
+
+IN_LIST_RE = re.compile(r'\bIN \((?:%s, )*%s\)')
+LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def fingerprint(sql):
+    """SQL без литералов и с одинаковыми списками IN (...)."""
+    return IN_LIST_RE.sub('IN (...)', LITERAL_RE.sub('?', sql))
+
+
+class QueryProfile:
+    """Счетчик запросов, времени БД и сериализации в рамках запроса."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.fingerprints = Counter()
+        self._serializer_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    @property
+    def duplicates(self):
+        """Повторяющиеся запросы — признак N+1."""
+        return {
+            sql: count
+            for sql, count in self.fingerprints.items() if count > 1
+        }
+
+    @contextmanager
+    def capture(self):
+        token = _current_profile.set(self)
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(
+                        connections[alias].execute_wrapper(self)
+                    )
+                yield self
+        finally:
+            _current_profile.reset(token)
+
+    @contextmanager
+    def serializer_phase(self):
+        self._serializer_depth += 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._serializer_depth -= 1
+            if not self._serializer_depth:
+                self.serializer_time += time.perf_counter() - start
+
+
+@contextmanager
+def query_budget(max_queries):
+    """Упасть, если блок выполнил больше max_queries запросов.
+
+    Пример для тестов:
+        with query_budget(8):
+            client.get('/api/recipes/')
+    """
+    with QueryProfile().capture() as profile:
+        yield profile
+    if profile.queries > max_queries:
+        raise QueryBudgetExceeded(
+            f'{profile.queries} запросов при бюджете {max_queries}; '
+            f'повторы: {profile.duplicates}'
+        )
+
+
+class ProfiledSerializerMixin:
+    """Учитывает время сериализации в текущем QueryProfile."""
+
+    def to_representation(self, instance):
+        profile = _current_profile.get()
+        if profile is None:
+            return super().to_representation(instance)
+        with profile.serializer_phase():
+            return super().to_representation(instance)
+
+
+class QueryProfilingMiddleware:
+    """Профилирование запросов к БД для каждого эндпоинта.
+
+    Добавляет заголовок Server-Timing и пишет строку лога в JSON.
+    Бюджет запросов задается у ViewSet словарем query_budget
+    {action: max_queries}; при QUERY_BUDGET_ENFORCE превышение
+    вызывает QueryBudgetExceeded, иначе пишется предупреждение.
+    """
+
+    def __init__(self, get_response):
+        if not settings.QUERY_PROFILING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.query_budget = None
+        start = time.perf_counter()
+        with QueryProfile().capture() as profile:
+            response = self.get_response(request)
+        total_time = time.perf_counter() - start
+
+        response['Server-Timing'] = ', '.join((
+            f'db;dur={profile.db_time * 1000:.1f};'
+            f'desc="{profile.queries} queries"',
+            f'serializer;dur={profile.serializer_time * 1000:.1f}',
+            f'total;dur={total_time * 1000:.1f}',
+        ))
+        match = request.resolver_match
+        record = {
+            'method': request.method,
+            'endpoint': match.route if match else request.path,
+            'status': response.status_code,
+            'queries': profile.queries,
+            'db_ms': round(profile.db_time * 1000, 1),
+            'serializer_ms': round(profile.serializer_time * 1000, 1),
+            'total_ms': round(total_time * 1000, 1),
+            'duplicates': profile.duplicates,
+            'budget': request.query_budget,
+        }
+        logger.info(json.dumps(record, ensure_ascii=False))
+
+        if (
+            request.query_budget is not None
+            and profile.queries > request.query_budget
+        ):
+            message = (
+                f'{record["method"]} {record["endpoint"]}: '
+                f'{profile.queries} запросов при бюджете '
+                f'{request.query_budget}'
+            )
+            if settings.QUERY_BUDGET_ENFORCE:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        actions = getattr(view_func, 'actions', None) or {}
+        budgets = getattr(getattr(view_func, 'cls', None), 'query_budget', {})
+        request.query_budget = budgets.get(
+            actions.get(request.method.lower())
+        )
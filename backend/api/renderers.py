@@ -0,0 +1,121 @@
+import csv
+import json
+
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.renderers import BaseRenderer
+
+from api.bulk import CSV_FIELDS, record_to_csv_row
+
+
+class Echo:
+    """Псевдобуфер для csv.writer: возвращает строку вместо записи."""
+
+    def write(self, value):
+        return value
+
+
+class FormatContentNegotiation(DefaultContentNegotiation):
+    """Выбор рендерера только по параметру ?format=, без учета Accept.
+
+    Без параметра используется первый рендерер из списка,
+    неизвестный формат приводит к ответу 404.
+    """
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        format_query_param = self.settings.URL_FORMAT_OVERRIDE
+        format = format_suffix or request.query_params.get(format_query_param)
+        if format:
+            renderers = self.filter_renderers(renderers, format)
+        renderer = renderers[0]
+        return renderer, renderer.media_type
+
+
+class StreamingRenderer(BaseRenderer):
+    """Базовый рендерер потоковых ответов.
+
+    Метод stream() построчно отдает данные для StreamingHttpResponse,
+    render() используется только для ответов с ошибками.
+    """
+
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data, ensure_ascii=False)
+
+    def stream(self, items):
+        raise NotImplementedError
+
+
+class ShoppingListRenderer(StreamingRenderer):
+    """Базовый рендерер агрегированных ингредиентов списка покупок."""
+
+
+class TextShoppingListRenderer(ShoppingListRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+    def stream(self, ingredients):
+        for ingredient in ingredients:
+            yield (
+                f'{ingredient["ingredient__name"]} '
+                f'{ingredient["ingredient__measurement_unit"]} - '
+                f'{ingredient["total_amount"]}\n'
+            )
+
+
+class CSVShoppingListRenderer(ShoppingListRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def stream(self, ingredients):
+        writer = csv.writer(Echo())
+        yield writer.writerow(
+            ('Ингредиент', 'Единица измерения', 'Количество')
+        )
+        for ingredient in ingredients:
+            yield writer.writerow((
+                ingredient['ingredient__name'],
+                ingredient['ingredient__measurement_unit'],
+                ingredient['total_amount'],
+            ))
+
+
+class JSONShoppingListRenderer(ShoppingListRenderer):
+    media_type = 'application/json'
+    format = 'json'
+
+    def stream(self, ingredients):
+        separator = '['
+        for ingredient in ingredients:
+            yield separator + json.dumps(
+                {
+                    'name': ingredient['ingredient__name'],
+                    'measurement_unit': (
+                        ingredient['ingredient__measurement_unit']
+                    ),
+                    'amount': ingredient['total_amount'],
+                },
+                ensure_ascii=False,
+            )
+            separator = ','
+        yield '[]' if separator == '[' else ']'
+
+
+class NDJSONRecipeRenderer(StreamingRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+    def stream(self, records):
+        for record in records:
+            yield json.dumps(record, ensure_ascii=False) + '\n'
+
+
+class CSVRecipeRenderer(StreamingRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def stream(self, records):
+        writer = csv.DictWriter(Echo(), CSV_FIELDS)
+        yield writer.writeheader()
+        for record in records:
+            yield writer.writerow(record_to_csv_row(record))
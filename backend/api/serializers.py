@@ -1,8 +1,14 @@
 from django.contrib.auth import get_user_model
+from django.db import transaction
 from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers, status
 from rest_framework.validators import UniqueTogetherValidator
 
+from api.cache import invalidate_shopping_lists
+from api.images import (
+    get_variant_name, get_variants, schedule_image_variants
+)
+from api.profiling import ProfiledSerializerMixin
 from community.models import Favorite, Follow, ShoppingCart
 from foodgram_backend import constants
 from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
@@ -10,10 +16,72 @@ from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
 User = get_user_model()
 
 
-class UserSerializer(serializers.ModelSerializer):
+class ProfiledModelSerializer(
+    ProfiledSerializerMixin, serializers.ModelSerializer
+):
+    pass
+
+
+class VariantImageField(Base64ImageField):
+    """Изображение в base64 на входе, URL обработанного варианта на выходе.
+
+    Размер варианта задается параметром запроса ?image_size= (small,
+    medium, large или original), иначе size, а внутри списков —
+    list_size. Пока фоновая обработка не закончена, отдается оригинал.
+    """
+
+    def __init__(self, *args, size=None, list_size=None, **kwargs):
+        self.size = size
+        self.list_size = list_size or size
+        super().__init__(*args, **kwargs)
+
+    def get_size(self):
+        request = self.context.get('request')
+        size = request and request.GET.get('image_size')
+        if size in constants.IMAGE_SIZES or size == 'original':
+            return size
+        in_list = isinstance(
+            getattr(self.parent, 'parent', None), serializers.ListSerializer
+        )
+        return self.list_size if in_list else self.size
+
+    def build_url(self, file, name):
+        url = file.storage.url(name)
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+    def to_representation(self, file):
+        if not file:
+            return None
+        size = self.get_size()
+        if size == 'original':
+            return self.build_url(file, file.name)
+        return self.build_url(
+            file, get_variant_name(file, constants.IMAGE_SIZES.get(size))
+        )
+
+
+class ImageSrcsetField(VariantImageField):
+    """Все готовые варианты изображения в формате атрибута srcset."""
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, file):
+        if not file:
+            return None
+        return ', '.join(
+            f'{self.build_url(file, name)} {width}w'
+            for width, name in sorted(get_variants(file).items())
+        ) or None
+
+
+class UserSerializer(ProfiledModelSerializer):
     is_subscribed = serializers.SerializerMethodField(
         read_only=True,
     )
+    avatar = VariantImageField(read_only=True)
 
     class Meta:
         model = User
@@ -33,6 +101,8 @@ class UserSerializer(serializers.ModelSerializer):
         }
 
     def get_is_subscribed(self, following):
+        if hasattr(following, 'is_subscribed'):
+            return following.is_subscribed
         request = self.context.get('request')
         return (
             request
@@ -43,14 +113,21 @@ class UserSerializer(serializers.ModelSerializer):
 
 
 class AvatarSerializer(serializers.ModelSerializer):
-    avatar = Base64ImageField()
+    avatar = VariantImageField()
 
     class Meta:
         model = User
         fields = ('avatar',)
 
+    def update(self, user, value):
+        user = super().update(user, value)
+        schedule_image_variants(
+            user, 'avatar', constants.AVATAR_IMAGE_WIDTHS
+        )
+        return user
+
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(ProfiledModelSerializer):
 
     class Meta:
         model = Tag
@@ -58,9 +135,7 @@ class TagSerializer(serializers.ModelSerializer):
 
 
 class CreateRecipeIngredientSerializer(serializers.ModelSerializer):
-    id = serializers.PrimaryKeyRelatedField(
-        queryset=Ingredient.objects.all(),
-    )
+    id = serializers.IntegerField()
     amount = serializers.IntegerField(
         min_value=constants.AMOUNT_MIN,
         max_value=constants.AMOUNT_MAX,
@@ -93,10 +168,7 @@ class IngredientRecipeSerializer(serializers.ModelSerializer):
 
 class RecipeCreateSerializer(serializers.ModelSerializer):
     ingredients = CreateRecipeIngredientSerializer(many=True)
-    tags = serializers.PrimaryKeyRelatedField(
-        queryset=Tag.objects.all(),
-        many=True,
-    )
+    tags = serializers.ListField(child=serializers.IntegerField())
     image = Base64ImageField()
     cooking_time = serializers.IntegerField(
         min_value=constants.COOKING_TIME_MIN,
@@ -115,28 +187,52 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
             'cooking_time',
         )
 
+    @transaction.atomic
     def create(self, value):
         ingredients = value.pop('ingredients')
         tags = value.pop('tags')
 
-        recipe = Recipe.objects.create(**value)
-        self._add_recipe_ingredients(recipe, ingredients)
+        recipe = Recipe.objects.create(
+            **value, ingredients_count=len(ingredients)
+        )
         recipe.tags.set(tags)
+        self._cache_relations(
+            recipe, self._add_recipe_ingredients(recipe, ingredients), tags
+        )
+        Recipe.objects.filter(pk=recipe.pk).update_search_vector()
+        schedule_image_variants(
+            recipe, 'image', constants.RECIPE_IMAGE_WIDTHS
+        )
 
         return recipe
 
+    @transaction.atomic
     def update(self, recipe, value):
         ingredients = value.pop('ingredients')
         tags = value.pop('tags')
 
-        recipe.tags.clear()
         recipe.tags.set(tags)
-        recipe.ingredients.clear()
-        self._add_recipe_ingredients(recipe, ingredients)
+        recipe_ingredients, changed = self._update_recipe_ingredients(
+            recipe, ingredients
+        )
+        if changed:
+            invalidate_shopping_lists((recipe.pk,))
+
+        recipe.ingredients_count = len(recipe_ingredients)
+        recipe = super().update(recipe, value)
+        if changed or {'name', 'text'} & value.keys():
+            Recipe.objects.filter(pk=recipe.pk).update_search_vector()
+        self._cache_relations(recipe, recipe_ingredients, tags)
+        if 'image' in value:
+            schedule_image_variants(
+                recipe, 'image', constants.RECIPE_IMAGE_WIDTHS
+            )
 
-        return super().update(recipe, value)
+        return recipe
 
     def to_representation(self, instance):
+        if hasattr(self, '_saved_relations'):
+            instance._prefetched_objects_cache = dict(self._saved_relations)
         return RecipeDetailSerializer(
             instance,
             context={
@@ -155,7 +251,8 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
                 "Теги не могут повторяться"
             )
 
-        return value
+        tags = self._get_objects(Tag, value, "Теги не найдены")
+        return [tags[tag_id] for tag_id in value]
 
     def validate_ingredients(self, value):
         if not value:
@@ -163,26 +260,94 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
                 "Отсутствует обязательное поле 'ingredients'"
             )
 
-        ingredients_id = [ingredient['id'].id for ingredient in value]
+        ingredients_id = [ingredient['id'] for ingredient in value]
         if len(ingredients_id) != len(set(ingredients_id)):
             raise serializers.ValidationError(
                 "Ингредиенты не могут повторяться"
             )
 
+        ingredients = self._get_objects(
+            Ingredient, ingredients_id, "Ингредиенты не найдены"
+        )
+        for item in value:
+            item['ingredient'] = ingredients[item['id']]
+
         return value
 
+    def _get_objects(self, model, ids, message):
+        """Объекты по id одним запросом, со списком всех отсутствующих."""
+        objects = model.objects.in_bulk(ids)
+        missing = sorted(set(ids) - objects.keys())
+        if missing:
+            raise serializers.ValidationError(f"{message}: {missing}")
+        return objects
+
+    def _cache_relations(self, instance, recipe_ingredients, tags):
+        """Запомнить сохраненные связи, чтобы построить из них ответ.
+
+        UpdateModelMixin сбрасывает кэш prefetch у объекта, поэтому
+        связи кладутся в него в to_representation.
+        """
+        self._saved_relations = {
+            'recipe_ingredients': recipe_ingredients,
+            'tags': tags,
+        }
+
     def _add_recipe_ingredients(self, instance, ingredients):
-        RecipeIngredient.objects.bulk_create(
+        return RecipeIngredient.objects.bulk_create(
             RecipeIngredient(
                 recipe=instance,
-                ingredient=item.get('id'),
-                amount=item.get('amount'),
+                ingredient=item['ingredient'],
+                amount=item['amount'],
             )
             for item in ingredients
         )
 
+    def _update_recipe_ingredients(self, instance, ingredients):
+        """Применить к рецепту только разницу в составе ингредиентов.
+
+        Возвращает итоговые строки в порядке запроса и признак того,
+        что состав или количество изменились.
+        """
+        items = {item['id']: item for item in ingredients}
+        current = {
+            recipe_ingredient.ingredient_id: recipe_ingredient
+            for recipe_ingredient in instance.recipe_ingredients.all()
+        }
+        removed = current.keys() - items.keys()
+        added = [
+            item for item in ingredients if item['id'] not in current
+        ]
+        changed = []
+        for ingredient_id, recipe_ingredient in current.items():
+            if ingredient_id not in items:
+                continue
+            item = items[ingredient_id]
+            recipe_ingredient.ingredient = item['ingredient']
+            if recipe_ingredient.amount != item['amount']:
+                recipe_ingredient.amount = item['amount']
+                changed.append(recipe_ingredient)
+
+        if removed:
+            instance.recipe_ingredients.filter(
+                ingredient_id__in=removed
+            ).delete()
+        if changed:
+            RecipeIngredient.objects.bulk_update(changed, ('amount',))
+        rows = {
+            recipe_ingredient.ingredient_id: recipe_ingredient
+            for recipe_ingredient in (
+                *current.values(),
+                *self._add_recipe_ingredients(instance, added),
+            )
+        }
+        return (
+            [rows[item['id']] for item in ingredients],
+            bool(removed or changed or added),
+        )
+
 
-class RecipeDetailSerializer(serializers.ModelSerializer):
+class RecipeDetailSerializer(ProfiledModelSerializer):
     ingredients = IngredientRecipeSerializer(
         many=True,
         source='recipe_ingredients',
@@ -199,7 +364,10 @@ class RecipeDetailSerializer(serializers.ModelSerializer):
     is_in_shopping_cart = serializers.SerializerMethodField(
         method_name='get_is_in_shopping_cart'
     )
-    image = Base64ImageField(max_length=None)
+    image = VariantImageField(
+        read_only=True, size='large', list_size='medium'
+    )
+    image_srcset = ImageSrcsetField(source='image')
 
     class Meta:
         model = Recipe
@@ -212,11 +380,14 @@ class RecipeDetailSerializer(serializers.ModelSerializer):
             'is_in_shopping_cart',
             'name',
             'image',
+            'image_srcset',
             'text',
             'cooking_time',
         )
 
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         request = self.context['request']
         user = request.user
         return (
@@ -225,6 +396,8 @@ class RecipeDetailSerializer(serializers.ModelSerializer):
         )
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         request = self.context['request']
         user = request.user
         return (
@@ -233,7 +406,43 @@ class RecipeDetailSerializer(serializers.ModelSerializer):
         )
 
 
-class IngredientsSerializer(serializers.ModelSerializer):
+class PantryRecipeSerializer(RecipeDetailSerializer):
+    """Рецепт в подборке по имеющимся ингредиентам."""
+
+    matched_count = serializers.IntegerField(read_only=True)
+    coverage = serializers.FloatField(read_only=True)
+
+    class Meta(RecipeDetailSerializer.Meta):
+        fields = RecipeDetailSerializer.Meta.fields + (
+            'matched_count',
+            'coverage',
+        )
+
+
+class PantrySerializer(serializers.Serializer):
+    """Имеющиеся ингредиенты: ?ingredients=1,2 или ?ingredients=1&..."""
+
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=constants.PANTRY_MAX_INGREDIENTS,
+    )
+
+    def to_internal_value(self, data):
+        return super().to_internal_value({
+            'ingredients': [
+                value
+                for raw in data.getlist('ingredients')
+                for value in raw.split(',')
+                if value.strip()
+            ],
+        })
+
+    def validate_ingredients(self, value):
+        return sorted(set(value))
+
+
+class IngredientsSerializer(ProfiledModelSerializer):
 
     class Meta:
         model = Ingredient
@@ -293,9 +502,7 @@ class FollowGetSerializer(UserSerializer):
     recipes = serializers.SerializerMethodField(
         method_name='get_recipes'
     )
-    recipes_count = serializers.SerializerMethodField(
-        method_name='get_recipes_count'
-    )
+    recipes_count = serializers.ReadOnlyField()
 
     class Meta(UserSerializer.Meta):
         model = User
@@ -309,24 +516,25 @@ class FollowGetSerializer(UserSerializer):
         )
 
     def get_recipes(self, author):
-        recipes = author.recipes.all()
         request = self.context.get('request')
-
-        if 'recipes_limit' in self.context['request'].GET:
-            recipes_limit = self.context['request'].GET['recipes_limit']
-            if recipes_limit.isdigit():
-                recipes = recipes[:int(recipes_limit)]
+        if 'author_recipes' in self.context:
+            recipes = self.context['author_recipes'].get(author.id, [])
+        else:
+            recipes = author.recipes.all()
+            if 'recipes_limit' in request.GET:
+                recipes_limit = request.GET['recipes_limit']
+                if recipes_limit.isdigit():
+                    recipes = recipes[:int(recipes_limit)]
         return RecipeShortSerializer(
             recipes,
             many=True,
             context={'request': request}
         ).data
 
-    def get_recipes_count(self, user):
-        return user.recipes.count()
-
 
-class RecipeShortSerializer(serializers.ModelSerializer):
+class RecipeShortSerializer(ProfiledModelSerializer):
+    image = VariantImageField(read_only=True, size='medium')
+    image_srcset = ImageSrcsetField(source='image')
 
     class Meta:
         model = Recipe
@@ -334,6 +542,7 @@ class RecipeShortSerializer(serializers.ModelSerializer):
             'id',
             'name',
             'image',
+            'image_srcset',
             'cooking_time'
         )
 
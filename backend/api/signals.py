@@ -0,0 +1,83 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from api.cache import (
+    FAVORITES, FOLLOWS, INGREDIENTS, POPULARITY, RECIPES, SHOPPING_CART,
+    TAGS, USERS, bump_catalogue_version, bump_user_version,
+    forget_short_link, invalidate_shopping_lists
+)
+from community.models import Favorite, Follow, ShoppingCart, ShortLink
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+
+User = get_user_model()
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def invalidate_tag_catalogue(**kwargs):
+    bump_catalogue_version(TAGS)
+
+
+@receiver(post_save, sender=Tag)
+def touch_tag_recipes(instance, created, **kwargs):
+    """Переименованный тег меняет представление рецептов."""
+    if not created:
+        Recipe.objects.filter(tags=instance).update(updated_at=timezone.now())
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def invalidate_ingredient_catalogue(**kwargs):
+    bump_catalogue_version(INGREDIENTS)
+
+
+@receiver(post_save, sender=Ingredient)
+def update_recipe_search_vectors(instance, created, **kwargs):
+    """Переименованный ингредиент меняет поисковые векторы,
+    представление рецептов и списки покупок.
+    """
+    if not created:
+        recipes = Recipe.objects.filter(
+            recipe_ingredients__ingredient=instance
+        )
+        recipes.update(updated_at=timezone.now())
+        recipes.update_search_vector()
+        invalidate_shopping_lists(recipes)
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+def invalidate_recipes(**kwargs):
+    bump_catalogue_version(RECIPES)
+
+
+@receiver((post_save, post_delete), sender=User)
+def invalidate_users(update_fields=None, **kwargs):
+    if update_fields is None or set(update_fields) != {'last_login'}:
+        bump_catalogue_version(USERS)
+
+
+@receiver((post_save, post_delete), sender=Favorite)
+def invalidate_favorites(instance, **kwargs):
+    bump_user_version(FAVORITES, instance.user_id)
+    bump_catalogue_version(POPULARITY)
+
+
+@receiver((post_save, post_delete), sender=ShoppingCart)
+def invalidate_shopping_cart(instance, **kwargs):
+    bump_user_version(SHOPPING_CART, instance.user_id)
+    bump_catalogue_version(POPULARITY)
+
+
+@receiver((post_save, post_delete), sender=RecipeIngredient)
+def invalidate_recipe_shopping_lists(instance, **kwargs):
+    invalidate_shopping_lists((instance.recipe_id,))
+
+
+@receiver((post_save, post_delete), sender=Follow)
+def invalidate_follows(instance, **kwargs):
+    bump_user_version(FOLLOWS, instance.user_id)
+
+
+@receiver(post_delete, sender=ShortLink)
+def invalidate_short_link(instance, **kwargs):
+    forget_short_link(instance.code)
@@ -0,0 +1,24 @@
+"""Потоковые ответы с запросами к базе."""
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connections
+
+
+def in_thread(iterable):
+    """Перебрать iterable в отдельном потоке.
+
+    ASGI-сервер Django читает потоковый ответ из цикла событий, где
+    обращения к ORM запрещены, поэтому генератор с запросами к базе
+    выполняется в своем потоке со своим соединением.
+    """
+    done = object()
+    iterator = iter(iterable)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        try:
+            while True:
+                item = executor.submit(next, iterator, done).result()
+                if item is done:
+                    return
+                yield item
+        finally:
+            executor.submit(connections.close_all).result()
@@ -0,0 +1,117 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from api.profiling import query_budget
+from api.views import RecipeViewSet, UsersViewSet
+from community.models import Favorite, Follow, ShoppingCart
+from foodgram_backend.constants import PAGE_SIZE
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+
+User = get_user_model()
+
+AUTHORS = 4
+RECIPES_PER_AUTHOR = 5
+
+
+class QueryBudgetTests(APITestCase):
+    """Число запросов горячих эндпоинтов не растет с объемом данных."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='reader', email='reader@example.com', password='pass',
+            first_name='Имя', last_name='Фамилия',
+        )
+        cls.token = Token.objects.create(user=cls.user)
+        tags = [
+            Tag.objects.create(name=f'Тег {number}', slug=f'tag-{number}')
+            for number in range(3)
+        ]
+        ingredients = [
+            Ingredient.objects.create(
+                name=f'Ингредиент {number}', measurement_unit='г'
+            )
+            for number in range(5)
+        ]
+        for number in range(AUTHORS):
+            author = User.objects.create_user(
+                username=f'author{number}',
+                email=f'author{number}@example.com',
+                password='pass',
+                first_name='Имя',
+                last_name='Фамилия',
+            )
+            Follow.objects.create(user=cls.user, following=author)
+            for index in range(RECIPES_PER_AUTHOR):
+                recipe = Recipe.objects.create(
+                    name=f'Рецепт {number}-{index}',
+                    text='Описание',
+                    cooking_time=10,
+                    image='recipes/test.png',
+                    author=author,
+                    ingredients_count=len(ingredients),
+                )
+                recipe.tags.set(tags)
+                RecipeIngredient.objects.bulk_create(
+                    RecipeIngredient(
+                        recipe=recipe, ingredient=ingredient, amount=10
+                    )
+                    for ingredient in ingredients
+                )
+                if index % 2:
+                    Favorite.objects.create(user=cls.user, recipe=recipe)
+                else:
+                    ShoppingCart.objects.create(user=cls.user, recipe=recipe)
+
+    def setUp(self):
+        cache.clear()
+
+    def authenticate(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def assert_within_budget(self, url, budget):
+        with query_budget(budget):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_recipe_list_anonymous(self):
+        data = self.assert_within_budget(
+            '/api/recipes/', RecipeViewSet.query_budget['list']
+        )
+        self.assertEqual(len(data['results']), PAGE_SIZE)
+
+    def test_recipe_list_authenticated(self):
+        self.authenticate()
+        data = self.assert_within_budget(
+            '/api/recipes/', RecipeViewSet.query_budget['list']
+        )
+        self.assertEqual(len(data['results']), PAGE_SIZE)
+        self.assertTrue(any(
+            recipe['is_favorited'] or recipe['is_in_shopping_cart']
+            for recipe in data['results']
+        ))
+
+    def test_recipe_list_cursor_popular(self):
+        self.authenticate()
+        data = self.assert_within_budget(
+            '/api/recipes/?ordering=popular&pagination=cursor',
+            RecipeViewSet.query_budget['list'],
+        )
+        self.assertEqual(len(data['results']), PAGE_SIZE)
+        self.assert_within_budget(
+            data['next'], RecipeViewSet.query_budget['list']
+        )
+
+    def test_subscriptions_with_recipes_limit(self):
+        self.authenticate()
+        data = self.assert_within_budget(
+            '/api/users/subscriptions/?recipes_limit=2',
+            UsersViewSet.query_budget['subscriptions'],
+        )
+        self.assertEqual(data['count'], AUTHORS)
+        for author in data['results']:
+            self.assertEqual(len(author['recipes']), 2)
+            self.assertEqual(author['recipes_count'], RECIPES_PER_AUTHOR)
@@ -1,32 +1,184 @@
 import os
+from collections import defaultdict
+from itertools import islice
 
 from django.contrib.auth import get_user_model
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.db.models import (
+    BooleanField, Count, Exists, F, FloatField, OuterRef, Prefetch, Sum,
+    Value, Window
+)
+from django.db.models.functions import Cast, Greatest, RowNumber
+from django.http import StreamingHttpResponse
+from django.shortcuts import redirect
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet as BaseUserViewSet
-from hashlib import blake2b
 from rest_framework import permissions, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.generics import get_object_or_404
 from rest_framework.response import Response
 
 from api import serializers
-from api.filters import IngredientFilter, RecipeFilter
-from api.paginators import CustomPagination
+from api.bulk import RecipeImporter, export_records, read_records
+from api.cache import (
+    INGREDIENTS, POPULARITY, RECIPES, TAGS, USERS, get_ingredient_catalogue,
+    get_short_link_recipe_id, get_shopping_list, get_tag_catalogue
+)
+from api.conditional import ConditionalGetMixin
+from api.filters import RECIPE_ORDERINGS, IngredientFilter, RecipeFilter
+from api.images import delete_variants
+from api.paginators import (
+    FeedPagination, KeysetPagination, LimitPagination
+)
 from api.permissions import IsAuthorOrReadOnly
-from community.models import Follow, Favorite, ShoppingCart, ShortLink
-from foodgram_backend.constants import DIGEST_SIZE
+from api.renderers import (
+    CSVRecipeRenderer, CSVShoppingListRenderer, FormatContentNegotiation,
+    JSONShoppingListRenderer, NDJSONRecipeRenderer, TextShoppingListRenderer
+)
+from community.models import (
+    FeedItem, Follow, Favorite, ShoppingCart, ShortLink, make_short_code
+)
+from foodgram_backend.constants import (
+    CATALOGUE_CACHE_MAX_AGE, PANTRY_MAX_CANDIDATES, RECIPE_EXPORT_FILENAME,
+    RECIPE_IMPORT_MAX_RECORDS, RECOMMENDATIONS_TOP_K, SHOPPING_LIST_FILENAME
+)
 from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
 
 User = get_user_model()
 
+SHOPPING_LIST_RENDERERS = (
+    TextShoppingListRenderer,
+    CSVShoppingListRenderer,
+    JSONShoppingListRenderer,
+)
 
-class UsersViewSet(BaseUserViewSet):
+RECIPE_EXPORT_RENDERERS = (NDJSONRecipeRenderer, CSVRecipeRenderer)
+
+
+def annotate_is_subscribed(queryset, user):
+    if not user.is_authenticated:
+        return queryset.annotate(
+            is_subscribed=Value(False, output_field=BooleanField())
+        )
+    return queryset.annotate(
+        is_subscribed=Exists(
+            Follow.objects.filter(user=user, following=OuterRef('pk'))
+        )
+    )
+
+
+def get_latest_recipes(authors, limit=None):
+    """Последние рецепты авторов, сгруппированные по id автора.
+
+    При заданном limit превью для всех авторов выбираются одним запросом
+    с оконной функцией ROW_NUMBER() по каждому автору.
+    """
+    recipes = Recipe.objects.filter(author__in=authors)
+    if limit is not None:
+        ranked = recipes.annotate(
+            row_number=Window(
+                expression=RowNumber(),
+                partition_by=F('author_id'),
+                order_by=F('created_at').desc(),
+            )
+        ).order_by()
+        sql, params = ranked.query.sql_with_params()
+        recipes = Recipe.objects.raw(
+            f'SELECT * FROM ({sql}) AS ranked '
+            'WHERE ranked.row_number <= %s '
+            'ORDER BY ranked.created_at DESC',
+            (*params, limit),
+        )
+
+    author_recipes = defaultdict(list)
+    for recipe in recipes:
+        author_recipes[recipe.author_id].append(recipe)
+    return author_recipes
+
+
+def annotate_recipe_flags(queryset, user):
+    if not user.is_authenticated:
+        return queryset.annotate(
+            is_favorited=Value(False, output_field=BooleanField()),
+            is_in_shopping_cart=Value(False, output_field=BooleanField()),
+        )
+    return queryset.annotate(
+        is_favorited=Exists(
+            Favorite.objects.filter(user=user, recipe=OuterRef('pk'))
+        ),
+        is_in_shopping_cart=Exists(
+            ShoppingCart.objects.filter(user=user, recipe=OuterRef('pk'))
+        ),
+    )
+
+
+def get_pantry_candidates(ingredient_ids):
+    """id рецептов, из которых выбирается подборка по ingredient_ids.
+
+    С каждого ингредиента берется не больше
+    PANTRY_MAX_CANDIDATES // len(ingredient_ids) новейших рецептов по
+    индексу ограничения unique_recipe_ingredient (ingredient_id,
+    recipe_id). Редкие ингредиенты дают все свои рецепты, а частые
+    (соль, вода) — только новейшие, поэтому объем работы не зависит от
+    размера каталога.
+    """
+    limit = max(1, PANTRY_MAX_CANDIDATES // len(ingredient_ids))
+    postings = [
+        RecipeIngredient.objects.filter(ingredient_id=ingredient_id)
+        .order_by('-recipe_id')
+        .values_list('recipe_id', flat=True)[:limit]
+        for ingredient_id in ingredient_ids
+    ]
+    return set(postings[0].union(*postings[1:], all=True))
+
+
+def rank_recipes_by_pantry(ingredient_ids):
+    """id рецептов с ингредиентами из ingredient_ids по убыванию покрытия.
+
+    Покрытие — доля ингредиентов рецепта, которые есть в ingredient_ids.
+    Совпадения считаются только для кандидатов get_pantry_candidates,
+    а число ингредиентов рецепта берется из денормализованного
+    Recipe.ingredients_count.
+    """
+    matched_count = Count('*')
+    return (
+        RecipeIngredient.objects.filter(
+            ingredient_id__in=ingredient_ids,
+            recipe_id__in=get_pantry_candidates(ingredient_ids),
+        )
+        .values('recipe_id')
+        .annotate(
+            matched_count=matched_count,
+            coverage=Cast(matched_count, FloatField()) / Greatest(
+                F('recipe__ingredients_count'), matched_count
+            ),
+        )
+        .order_by('-coverage', '-matched_count', '-recipe_id')
+    )
+
+
+class UsersViewSet(ConditionalGetMixin, BaseUserViewSet):
     queryset = User.objects.all()
     serializer_class = serializers.UserSerializer
     permission_classes = (permissions.IsAuthenticatedOrReadOnly,)
     filter_backends = (DjangoFilterBackend,)
+    pagination_class = FeedPagination
+    cursor_ordering = ('username',)
+    query_budget = {'list': 6, 'retrieve': 4, 'subscriptions': 6}
+    list_catalogues = (USERS,)
+
+    def get_object_pk(self):
+        if self.action == 'me':
+            return self.request.user.pk
+        return super().get_object_pk()
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ('list', 'retrieve'):
+            return annotate_is_subscribed(queryset, self.request.user)
+        return queryset
 
     def get_permissions(self):
         if self.action == 'me':
@@ -55,6 +207,8 @@ class UsersViewSet(BaseUserViewSet):
 
     @avatar.mapping.delete
     def delete_avatar(self, request):
+        delete_variants(request.user.avatar_variants)
+        request.user.avatar_variants = {}
         request.user.avatar.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
@@ -92,34 +246,87 @@ class UsersViewSet(BaseUserViewSet):
         permission_classes=(permissions.IsAuthenticated,),
         detail=False,
     )
-    # я не понял до конца,мне надо именно метод list() прописать?
-    # так его не получается в @action завернуть, как по другому, я не знаю.
-    # у меня уже не остается времени, в среду последний день сдачи проекта.
     def subscriptions(self, request):
         queryset = self.filter_queryset(
-            User.objects.filter(following__user=request.user)
+            User.objects.filter(following__user=request.user).annotate(
+                is_subscribed=Value(True, output_field=BooleanField()),
+            ).order_by('username')
         )
         pages = self.paginate_queryset(queryset)
+        authors = pages if pages is not None else list(queryset)
+        recipes_limit = request.query_params.get('recipes_limit', '')
+        serializer = serializers.FollowGetSerializer(
+            authors,
+            many=True,
+            context={
+                'request': request,
+                'author_recipes': get_latest_recipes(
+                    authors,
+                    int(recipes_limit) if recipes_limit.isdigit() else None,
+                ),
+            }
+        )
         if pages is not None:
-            serializer = serializers.FollowGetSerializer(
-                pages, many=True, context={'request': request}
-            )
             return self.get_paginated_response(serializer.data)
-
-        serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
-    queryset = Recipe.objects.all()
+class RecipeViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
+    queryset = Recipe.objects.defer('search_vector')
     permission_classes = (
         permissions.IsAuthenticatedOrReadOnly,
         IsAuthorOrReadOnly
     )
     serializer_class = serializers.RecipeCreateSerializer
-    pagination_class = CustomPagination
+    pagination_class = FeedPagination
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
+    query_budget = {
+        'list': 8,
+        'retrieve': 7,
+        'pantry': 7,
+        'feed': 6,
+        'recommendations': 2,
+    }
+    list_catalogues = (RECIPES, USERS, TAGS, INGREDIENTS)
+    last_modified_fields = ('updated_at', 'author__updated_at')
+
+    def get_list_catalogues(self):
+        if self.request.query_params.get('ordering') in (
+            'popular', 'trending'
+        ):
+            return (*self.list_catalogues, POPULARITY)
+        return self.list_catalogues
+
+    @property
+    def cursor_ordering(self):
+        """Порядок курсорной пагинации списка совпадает с ?ordering=."""
+        if self.action != 'list':
+            return RECIPE_ORDERINGS['newest']
+        return RECIPE_ORDERINGS.get(
+            self.request.query_params.get('ordering'),
+            RECIPE_ORDERINGS['newest'],
+        )
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action not in ('list', 'retrieve', 'pantry', 'feed'):
+            return queryset
+
+        user = self.request.user
+        return annotate_recipe_flags(queryset, user).prefetch_related(
+            'tags',
+            Prefetch(
+                'recipe_ingredients',
+                queryset=RecipeIngredient.objects.select_related(
+                    'ingredient'
+                ),
+            ),
+            Prefetch(
+                'author',
+                queryset=annotate_is_subscribed(User.objects.all(), user),
+            ),
+        )
 
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
@@ -129,12 +336,6 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return serializers.RecipeDetailSerializer
         return serializers.RecipeCreateSerializer
 
-    def generate_short_url(self, url):
-        domain = os.getenv('DOMAIN', 'localhost')
-        base_url = f'https://{domain}/'
-        hash_url = blake2b(url.encode(), digest_size=DIGEST_SIZE).hexdigest()
-        return f'{base_url}{hash_url}'
-
     @action(
         detail=True,
         methods=['get'],
@@ -142,16 +343,15 @@ class RecipeViewSet(viewsets.ModelViewSet):
         url_name='get_link',
     )
     def get_short_link(self, request, pk):
-        domain = os.getenv('DOMAIN', 'localhost')
         recipe = get_object_or_404(Recipe, id=pk)
-        recipe_url = f'https://{domain}/recipes/{recipe.pk}/'
-        short_link = self.generate_short_url(recipe_url)
-        short_link_obj, created = ShortLink.objects.get_or_create(
-            full_url=recipe_url,
-            defaults={'short_link': short_link, 'recipe': recipe}
+        short_link, _ = ShortLink.objects.get_or_create(
+            recipe=recipe,
+            defaults={'code': make_short_code(recipe.pk)},
         )
+        domain = os.getenv('DOMAIN', 'localhost')
+        path = reverse('short_link', args=(short_link.code,))
         return Response(
-            {'short-link': str(short_link_obj.full_url)},
+            {'short-link': f'https://{domain}{path}'},
             status=status.HTTP_200_OK
         )
 
@@ -190,9 +390,12 @@ class RecipeViewSet(viewsets.ModelViewSet):
         methods=['get'],
         url_path='download_shopping_cart',
         detail=False,
-        permission_classes=(permissions.IsAuthenticated, )
+        permission_classes=(permissions.IsAuthenticated, ),
+        renderer_classes=SHOPPING_LIST_RENDERERS,
+        content_negotiation_class=FormatContentNegotiation,
     )
     def download_shopping_cart(self, request):
+        renderer = request.accepted_renderer
         shopping_cart_ingredients = (
             RecipeIngredient.objects.filter(
                 recipe__cart_recipes__user=request.user
@@ -201,27 +404,145 @@ class RecipeViewSet(viewsets.ModelViewSet):
                 'ingredient__measurement_unit'
             ).annotate(total_amount=Sum('amount')).order_by('ingredient__name')
         )
-        shopping_list = self._prepare_recipes(shopping_cart_ingredients)
-        return self.forming_shopping_list(shopping_list)
-
-    def _prepare_recipes(self, ingredients):
-        shopping_list = []
-        for ingredient in ingredients:
-            name = ingredient['ingredient__name']
-            unit = ingredient['ingredient__measurement_unit']
-            amount = ingredient['total_amount']
-            shopping_list.append(f'{name} {unit} - {amount}')
-        shopping_list_text = '\n'.join(shopping_list)
-        return shopping_list_text
-
-    def forming_shopping_list(self, shop_list_text):
-        response = HttpResponse(
-            shop_list_text,
-            content_type='text/plain',
-        )
-        response[
-            'Content-Disposition'
-        ] = 'attachment; file_name="shopping_list.txt'
+        response = StreamingHttpResponse(
+            renderer.stream(
+                get_shopping_list(request.user, shopping_cart_ingredients)
+            ),
+            content_type=f'{renderer.media_type}; charset={renderer.charset}',
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="{SHOPPING_LIST_FILENAME}.'
+            f'{renderer.format}"'
+        )
+        return response
+
+    @action(
+        methods=['get'],
+        url_path='recommendations',
+        detail=True,
+    )
+    def recommendations(self, request, pk):
+        """Рецепты, которые добавляют вместе с этим, из готовой таблицы."""
+        recipe = get_object_or_404(Recipe.objects.only('id'), id=pk)
+        recommended = self.get_queryset().filter(
+            recommended_for__recipe=recipe
+        ).order_by('-recommended_for__score', 'id')[:RECOMMENDATIONS_TOP_K]
+        return Response(serializers.RecipeShortSerializer(
+            recommended, many=True, context=self.get_serializer_context()
+        ).data)
+
+    @action(
+        methods=['get'],
+        url_path='pantry',
+        detail=False,
+        pagination_class=LimitPagination,
+    )
+    def pantry(self, request):
+        """Рецепты из имеющихся ингредиентов, по убыванию покрытия."""
+        serializer = serializers.PantrySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        ranking = self.paginate_queryset(
+            rank_recipes_by_pantry(serializer.validated_data['ingredients'])
+        )
+        recipes = self.get_queryset().in_bulk(
+            [row['recipe_id'] for row in ranking]
+        )
+        page = []
+        for row in ranking:
+            recipe = recipes.get(row['recipe_id'])
+            if recipe is None:
+                continue
+            recipe.matched_count = row['matched_count']
+            recipe.coverage = row['coverage']
+            page.append(recipe)
+        return self.get_paginated_response(
+            serializers.PantryRecipeSerializer(
+                page, many=True, context=self.get_serializer_context()
+            ).data
+        )
+
+    @action(
+        methods=['get'],
+        url_path='feed',
+        detail=False,
+        permission_classes=(permissions.IsAuthenticated,),
+        pagination_class=KeysetPagination,
+    )
+    def feed(self, request):
+        """Лента рецептов авторов из подписок, от новых к старым."""
+        items = self.paginate_queryset(
+            FeedItem.objects.filter(user=request.user).only(
+                'recipe_id', 'created_at'
+            )
+        )
+        recipes = self.get_queryset().in_bulk(
+            [item.recipe_id for item in items]
+        )
+        return self.get_paginated_response(
+            self.get_serializer(
+                [
+                    recipes[item.recipe_id] for item in items
+                    if item.recipe_id in recipes
+                ],
+                many=True,
+            ).data
+        )
+
+    @action(
+        methods=['post'],
+        url_path='import',
+        detail=False,
+        permission_classes=(permissions.IsAdminUser,),
+    )
+    def import_recipes(self, request):
+        """Импорт NDJSON или CSV (Content-Type: text/csv) из тела запроса.
+
+        Тело читается построчно. Импорт идет внутри запроса, поэтому
+        число записей ограничено RECIPE_IMPORT_MAX_RECORDS, файлы больше
+        загружаются командой import_recipes.
+        """
+        stream = request.stream
+        lines = (
+            line.decode('utf-8', errors='replace')
+            for line in iter(stream.readline, b'')
+        ) if stream else ()
+        format = (
+            'csv' if request.content_type.startswith('text/csv')
+            else 'ndjson'
+        )
+        records = list(islice(
+            read_records(lines, format), RECIPE_IMPORT_MAX_RECORDS + 1
+        ))
+        if len(records) > RECIPE_IMPORT_MAX_RECORDS:
+            return Response(
+                {'detail': (
+                    f'Больше {RECIPE_IMPORT_MAX_RECORDS} записей: '
+                    'используйте команду import_recipes.'
+                )},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            )
+        return Response(
+            RecipeImporter().run(records), status=status.HTTP_200_OK,
+        )
+
+    @action(
+        methods=['get'],
+        url_path='export',
+        detail=False,
+        permission_classes=(permissions.IsAdminUser,),
+        renderer_classes=RECIPE_EXPORT_RENDERERS,
+        content_negotiation_class=FormatContentNegotiation,
+    )
+    def export_recipes(self, request):
+        renderer = request.accepted_renderer
+        response = StreamingHttpResponse(
+            renderer.stream(export_records()),
+            content_type=f'{renderer.media_type}; charset={renderer.charset}',
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="{RECIPE_EXPORT_FILENAME}.'
+            f'{renderer.format}"'
+        )
         return response
 
     def _add_recipe(self, serializer_class, pk):
@@ -250,15 +571,63 @@ class RecipeViewSet(viewsets.ModelViewSet):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class IngredientsViewSet(viewsets.ReadOnlyModelViewSet):
+class CatalogueViewSet(viewsets.ReadOnlyModelViewSet):
+    """Справочник, список которого отдается из кэша в памяти процесса.
+
+    ETag совпадает с версией справочника, поэтому клиенты и nginx могут
+    перепроверять ответ условным запросом и получать 304.
+    """
+
+    pagination_class = None
+
+    def get_catalogue(self):
+        raise NotImplementedError
+
+    def get_catalogue_data(self, catalogue):
+        return catalogue.as_list()
+
+    def list(self, request, *args, **kwargs):
+        catalogue = self.get_catalogue()
+        etag = quote_etag(catalogue.version)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            data = self.get_catalogue_data(catalogue)
+            if data is None:
+                return super().list(request, *args, **kwargs)
+            response = Response(data)
+        response['ETag'] = etag
+        patch_cache_control(
+            response, public=True, max_age=CATALOGUE_CACHE_MAX_AGE
+        )
+        return response
+
+
+class IngredientsViewSet(CatalogueViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = serializers.IngredientsSerializer
     filter_backends = (DjangoFilterBackend,)
     filterset_class = IngredientFilter
-    pagination_class = None
 
+    def get_catalogue(self):
+        return get_ingredient_catalogue()
+
+    def get_catalogue_data(self, catalogue):
+        if catalogue.rows is None:
+            return None
+        name = self.request.query_params.get('name')
+        if name:
+            return catalogue.search(name)
+        return catalogue.as_list()
 
-class TagsViewSet(viewsets.ReadOnlyModelViewSet):
+
+class TagsViewSet(CatalogueViewSet):
     queryset = Tag.objects.all()
     serializer_class = serializers.TagSerializer
-    pagination_class = None
+
+    def get_catalogue(self):
+        return get_tag_catalogue()
+
+
+def short_link_redirect(request, code):
+    recipe_id = get_short_link_recipe_id(code)
+    return redirect(f'/recipes/{recipe_id}/')
@@ -6,3 +6,6 @@ class CommunityConfig(AppConfig):
     name = 'community'
     verbose_name = 'Сообщество'
     verbose_name_plural = 'Сообщества'
+
+    def ready(self):
+        from community import signals  # noqa: F401
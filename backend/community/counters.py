@@ -0,0 +1,66 @@
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from foodgram_backend.constants import POPULARITY_BATCH_SIZE
+from recipes.models import get_popularity, get_trending_score
+
+
+def _count(model, field_name):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field_name: OuterRef('pk')})
+            .order_by()
+            .values(field_name)
+            .annotate(total=Count('pk'))
+            .values('total')
+        ),
+        Value(0),
+    )
+
+
+def recompute_counters(user_model, recipe_model, favorite_model,
+                       shopping_cart_model, follow_model):
+    """Пересчитать денормализованные счетчики одним UPDATE на таблицу.
+
+    Модели передаются аргументами, чтобы функцию можно было вызывать
+    и из миграций с историческими моделями.
+    """
+    recipe_model.objects.update(
+        favorites_count=_count(favorite_model, 'recipe'),
+        shopping_carts_count=_count(shopping_cart_model, 'recipe'),
+    )
+    user_model.objects.update(
+        recipes_count=_count(recipe_model, 'author'),
+        followers_count=_count(follow_model, 'following'),
+    )
+
+
+def recompute_ingredients_counts(recipe_model, recipe_ingredient_model):
+    """Пересчитать количество ингредиентов рецептов одним UPDATE."""
+    recipe_model.objects.update(
+        ingredients_count=_count(recipe_ingredient_model, 'recipe'),
+    )
+
+
+def recompute_popularity(recipe_model, batch_size=POPULARITY_BATCH_SIZE):
+    """Пересчитать popularity и trending_score по счетчикам рецептов.
+
+    trending_score зависит от даты публикации, поэтому считается в
+    Python и записывается пачками через bulk_update.
+    """
+    recipes = recipe_model.objects.order_by('id').only(
+        'id', 'created_at', 'favorites_count', 'shopping_carts_count'
+    )
+    last_id = 0
+    while batch := list(recipes.filter(id__gt=last_id)[:batch_size]):
+        for recipe in batch:
+            recipe.popularity = get_popularity(
+                recipe.favorites_count, recipe.shopping_carts_count
+            )
+            recipe.trending_score = get_trending_score(
+                recipe.popularity, recipe.created_at
+            )
+        recipe_model.objects.bulk_update(
+            batch, ('popularity', 'trending_score')
+        )
+        last_id = batch[-1].id
@@ -0,0 +1,81 @@
+from collections import defaultdict
+
+from community.models import FeedItem, Follow
+from foodgram_backend.constants import FEED_BACKFILL_RECIPES, FEED_BATCH_SIZE
+from recipes.models import Recipe
+
+
+def fan_out(recipes):
+    """Разложить новые рецепты по лентам подписчиков их авторов."""
+    by_author = defaultdict(list)
+    for recipe in recipes:
+        by_author[recipe.author_id].append(recipe)
+    followers = Follow.objects.filter(
+        following_id__in=by_author
+    ).values_list('following_id', 'user_id')
+    FeedItem.objects.bulk_create(
+        (
+            FeedItem(
+                user_id=user_id,
+                author_id=author_id,
+                recipe_id=recipe.pk,
+                created_at=recipe.created_at,
+            )
+            for author_id, user_id in followers.iterator()
+            for recipe in by_author[author_id]
+        ),
+        batch_size=FEED_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def backfill(user_id, author_id, limit=FEED_BACKFILL_RECIPES):
+    """Добавить в ленту нового подписчика последние рецепты автора."""
+    FeedItem.objects.bulk_create(
+        (
+            FeedItem(
+                user_id=user_id,
+                author_id=author_id,
+                recipe_id=recipe_id,
+                created_at=created_at,
+            )
+            for recipe_id, created_at in Recipe.objects.filter(
+                author_id=author_id
+            ).order_by('-created_at', '-id').values_list(
+                'id', 'created_at'
+            )[:limit]
+        ),
+        batch_size=FEED_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def rebuild_feeds(feed_item_model, follow_model, recipe_model,
+                  limit=FEED_BACKFILL_RECIPES):
+    """Заново собрать ленты всех пользователей по подпискам."""
+    feed_item_model.objects.all().delete()
+    authors = follow_model.objects.order_by().values_list(
+        'following_id', flat=True
+    ).distinct()
+    for author_id in list(authors):
+        recipes = list(
+            recipe_model.objects.filter(author_id=author_id)
+            .order_by('-created_at', '-id')
+            .values_list('id', 'created_at')[:limit]
+        )
+        followers = follow_model.objects.filter(
+            following_id=author_id
+        ).values_list('user_id', flat=True)
+        feed_item_model.objects.bulk_create(
+            (
+                feed_item_model(
+                    user_id=user_id,
+                    author_id=author_id,
+                    recipe_id=recipe_id,
+                    created_at=created_at,
+                )
+                for user_id in followers.iterator()
+                for recipe_id, created_at in recipes
+            ),
+            batch_size=FEED_BATCH_SIZE,
+        )
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from community.recommendations import (
+    rebuild_recommendations, refresh_stale_recommendations
+)
+
+
+class Command(BaseCommand):
+    """Расчет рекомендаций по совместным добавлениям в избранное и корзину."""
+
+    help = (
+        'Пересчитывает похожие рецепты. С --incremental обновляет только '
+        'рецепты, у которых с прошлого расчета изменились избранное или '
+        'корзины; команду удобно запускать по расписанию.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--incremental',
+            action='store_true',
+            help='Пересчитать только рецепты с изменениями.',
+        )
+
+    def handle(self, *args, **options):
+        if options['incremental']:
+            total = refresh_stale_recommendations()
+        else:
+            total = rebuild_recommendations()
+        self.stdout.write(self.style.SUCCESS(
+            f'Рецептов с пересчитанными рекомендациями: {total}'
+        ))
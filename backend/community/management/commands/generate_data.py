@@ -0,0 +1,211 @@
+import io
+import random
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from PIL import Image
+
+from api.cache import (
+    INGREDIENTS, POPULARITY, RECIPES, TAGS, USERS, bump_catalogue_version
+)
+from community.counters import (
+    recompute_counters, recompute_ingredients_counts, recompute_popularity
+)
+from community.feeds import rebuild_feeds
+from community.models import FeedItem, Favorite, Follow, ShoppingCart
+from foodgram_backend import constants
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+
+User = get_user_model()
+
+IMAGE_NAME = 'recipes/synthetic.png'
+PASSWORD = 'synthetic-password'
+MIN_INGREDIENTS = 200
+MIN_TAGS = 8
+
+
+class Command(BaseCommand):
+    """Генерация синтетических данных для нагрузочных замеров."""
+
+    help = (
+        'Создает пользователей, подписки, рецепты с ингредиентами и '
+        'тегами, избранное и корзины пакетными вставками.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument(
+            '--recipes-per-user', type=int, default=10,
+        )
+        parser.add_argument(
+            '--follows-per-user', type=int, default=10,
+        )
+        parser.add_argument(
+            '--favorites-per-user', type=int, default=20,
+        )
+        parser.add_argument(
+            '--cart-per-user', type=int, default=5,
+        )
+        parser.add_argument(
+            '--ingredients-per-recipe', type=int, default=8,
+        )
+        parser.add_argument(
+            '--tags-per-recipe', type=int, default=2,
+        )
+        parser.add_argument(
+            '--prefix',
+            default='synthetic',
+            help='Префикс имен пользователей и рецептов.',
+        )
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Зерно генератора, чтобы наборы были воспроизводимы.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=constants.SYNTHETIC_DATA_BATCH_SIZE,
+        )
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        prefix = options['prefix']
+        if User.objects.filter(username__startswith=f'{prefix}_').exists():
+            raise CommandError(
+                f'Данные с префиксом {prefix} уже есть, укажите --prefix'
+            )
+
+        with transaction.atomic():
+            tags = self.ensure_tags(prefix)
+            ingredients = self.ensure_ingredients(prefix)
+            users = self.create_users(prefix, options['users'])
+            recipes = self.create_recipes(
+                prefix, users, options['recipes_per_user']
+            )
+            self.create_recipe_relations(
+                recipes, tags, ingredients,
+                options['tags_per_recipe'], options['ingredients_per_recipe'],
+            )
+            Recipe.objects.filter(
+                pk__in=[recipe.pk for recipe in recipes]
+            ).update_search_vector()
+            follows = self.create_follows(users, options['follows_per_user'])
+            favorites = self.create_user_recipes(
+                Favorite, users, recipes, options['favorites_per_user']
+            )
+            carts = self.create_user_recipes(
+                ShoppingCart, users, recipes, options['cart_per_user']
+            )
+            recompute_counters(User, Recipe, Favorite, ShoppingCart, Follow)
+            recompute_ingredients_counts(Recipe, RecipeIngredient)
+            recompute_popularity(Recipe)
+            rebuild_feeds(FeedItem, Follow, Recipe)
+        for name in (TAGS, INGREDIENTS, RECIPES, USERS, POPULARITY):
+            bump_catalogue_version(name)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Пользователей: {len(users)}, рецептов: {len(recipes)}, '
+            f'подписок: {follows}, избранного: {favorites}, '
+            f'в корзинах: {carts}. Пароль пользователей: {PASSWORD}'
+        ))
+
+    def bulk_create(self, model, objects):
+        return model.objects.bulk_create(objects, batch_size=self.batch_size)
+
+    def ensure_tags(self, prefix):
+        missing = MIN_TAGS - Tag.objects.count()
+        self.bulk_create(Tag, [
+            Tag(name=f'{prefix} тег {number}', slug=f'{prefix}-{number}')
+            for number in range(missing)
+        ])
+        return list(Tag.objects.values_list('id', flat=True))
+
+    def ensure_ingredients(self, prefix):
+        missing = MIN_INGREDIENTS - Ingredient.objects.count()
+        self.bulk_create(Ingredient, [
+            Ingredient(
+                name=f'{prefix} ингредиент {number}', measurement_unit='г'
+            )
+            for number in range(missing)
+        ])
+        return list(Ingredient.objects.values_list('id', flat=True))
+
+    def create_users(self, prefix, count):
+        password = make_password(PASSWORD)
+        return self.bulk_create(User, [
+            User(
+                username=f'{prefix}_{number}',
+                email=f'{prefix}_{number}@example.com',
+                first_name='Имя',
+                last_name=f'Фамилия {number}',
+                password=password,
+            )
+            for number in range(count)
+        ])
+
+    def create_recipes(self, prefix, users, per_user):
+        if not default_storage.exists(IMAGE_NAME):
+            buffer = io.BytesIO()
+            Image.new('RGB', (1, 1)).save(buffer, 'PNG')
+            default_storage.save(IMAGE_NAME, ContentFile(buffer.getvalue()))
+        return self.bulk_create(Recipe, [
+            Recipe(
+                name=f'{prefix} рецепт {user.id}-{number}',
+                text='Синтетический рецепт для нагрузочного тестирования.',
+                cooking_time=self.random.randint(
+                    constants.COOKING_TIME_MIN, 180
+                ),
+                image=IMAGE_NAME,
+                author=user,
+            )
+            for user in users
+            for number in range(per_user)
+        ])
+
+    def sample(self, population, count):
+        return self.random.sample(population, min(count, len(population)))
+
+    def create_recipe_relations(self, recipes, tags, ingredients,
+                                tags_per_recipe, ingredients_per_recipe):
+        recipe_tags = Recipe.tags.through
+        self.bulk_create(recipe_tags, [
+            recipe_tags(recipe_id=recipe.id, tag_id=tag_id)
+            for recipe in recipes
+            for tag_id in self.sample(tags, tags_per_recipe)
+        ])
+        self.bulk_create(RecipeIngredient, [
+            RecipeIngredient(
+                recipe_id=recipe.id,
+                ingredient_id=ingredient_id,
+                amount=self.random.randint(constants.AMOUNT_MIN, 500),
+            )
+            for recipe in recipes
+            for ingredient_id in self.sample(
+                ingredients, ingredients_per_recipe
+            )
+        ])
+
+    def create_follows(self, users, per_user):
+        follows = []
+        for user in users:
+            authors = [
+                author for author in self.sample(users, per_user + 1)
+                if author != user
+            ]
+            follows.extend(
+                Follow(user=user, following=author)
+                for author in authors[:per_user]
+            )
+        return len(self.bulk_create(Follow, follows))
+
+    def create_user_recipes(self, model, users, recipes, per_user):
+        return len(self.bulk_create(model, [
+            model(user=user, recipe=recipe)
+            for user in users
+            for recipe in self.sample(recipes, per_user)
+        ]))
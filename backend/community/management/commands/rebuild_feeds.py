@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from community.feeds import rebuild_feeds
+from community.models import FeedItem, Follow
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    """Пересборка лент подписок."""
+
+    help = (
+        'Заново собирает ленты подписок всех пользователей, например '
+        'после массовых правок подписок или рецептов в БД.'
+    )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            rebuild_feeds(FeedItem, Follow, Recipe)
+        self.stdout.write(self.style.SUCCESS(
+            f'Записей в лентах: {FeedItem.objects.count()}'
+        ))
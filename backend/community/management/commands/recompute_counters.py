@@ -0,0 +1,28 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.cache import POPULARITY, bump_catalogue_version
+from community.counters import (
+    recompute_counters, recompute_ingredients_counts, recompute_popularity
+)
+from community.models import Favorite, Follow, ShoppingCart
+from recipes.models import Recipe, RecipeIngredient
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    """Пересчет счетчиков избранного, корзин, рецептов, подписчиков,
+    ингредиентов рецептов и популярности рецептов.
+    """
+
+    help = 'Пересчитывает денормализованные счетчики по исходным таблицам.'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            recompute_counters(User, Recipe, Favorite, ShoppingCart, Follow)
+            recompute_ingredients_counts(Recipe, RecipeIngredient)
+            recompute_popularity(Recipe)
+        bump_catalogue_version(POPULARITY)
+        self.stdout.write(self.style.SUCCESS('Счетчики пересчитаны'))
@@ -0,0 +1,40 @@
+from django.db import migrations, models
+
+from community.models import make_short_code
+
+
+def fill_codes(apps, schema_editor):
+    ShortLink = apps.get_model('community', 'ShortLink')
+    short_links = list(ShortLink.objects.all())
+    for short_link in short_links:
+        short_link.code = make_short_code(short_link.recipe_id)
+    ShortLink.objects.bulk_update(short_links, ('code',))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('community', '0003_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shortlink',
+            name='code',
+            field=models.CharField(max_length=16, null=True, verbose_name='Код ссылки'),
+        ),
+        migrations.RunPython(fill_codes, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='shortlink',
+            name='code',
+            field=models.CharField(max_length=16, unique=True, verbose_name='Код ссылки'),
+        ),
+        migrations.RemoveField(
+            model_name='shortlink',
+            name='full_url',
+        ),
+        migrations.RemoveField(
+            model_name='shortlink',
+            name='short_link',
+        ),
+    ]
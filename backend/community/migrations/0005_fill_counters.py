@@ -0,0 +1,26 @@
+from django.db import migrations
+
+from community.counters import recompute_counters
+
+
+def fill_counters(apps, schema_editor):
+    recompute_counters(
+        apps.get_model('users', 'User'),
+        apps.get_model('recipes', 'Recipe'),
+        apps.get_model('community', 'Favorite'),
+        apps.get_model('community', 'ShoppingCart'),
+        apps.get_model('community', 'Follow'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('community', '0004_shortlink_code'),
+        ('recipes', '0004_recipe_counters'),
+        ('users', '0002_user_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -2,6 +2,7 @@ from django.core.exceptions import ValidationError
 from django.contrib.auth import get_user_model
 from django.db import models
 
+from foodgram_backend import constants
 from recipes.models import Recipe
 
 User = get_user_model()
@@ -41,6 +42,59 @@ class Follow(models.Model):
         return f'{self.user} подписан на {self.following}'
 
 
+class FeedItem(models.Model):
+    """Рецепт в ленте подписчика автора.
+
+    Строки создаются при публикации рецепта (fan-out on write), поэтому
+    лента читается одним проходом по индексу (user, -created_at, -id).
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Подписчик',
+        related_name='feed_items',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Автор',
+        related_name='+',
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        verbose_name='Рецепт',
+        related_name='feed_items',
+    )
+    created_at = models.DateTimeField(
+        verbose_name='Дата публикации',
+    )
+
+    class Meta:
+        verbose_name = 'Рецепт в ленте'
+        verbose_name_plural = 'Лента подписок'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'recipe'),
+                name='unique_feed_item',
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=('user', '-created_at', '-id'),
+                name='feed_user_created_at_id_idx',
+            ),
+            models.Index(
+                fields=('user', 'author'),
+                name='feed_user_author_idx',
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.recipe} в ленте {self.user}'
+
+
 class FavoriteShoppingCartMixin(models.Model):
     user = models.ForeignKey(
         User,
@@ -74,12 +128,21 @@ class Favorite(FavoriteShoppingCartMixin):
         return f'{self.recipe} в избранном у {self.user}'
 
 
+def make_short_code(recipe_id):
+    """Код короткой ссылки: id рецепта в base62, поэтому коды уникальны."""
+    alphabet = constants.SHORT_LINK_ALPHABET
+    code = ''
+    while True:
+        recipe_id, index = divmod(recipe_id, len(alphabet))
+        code = alphabet[index] + code
+        if not recipe_id:
+            return code
+
+
 class ShortLink(models.Model):
-    full_url = models.URLField(
-        verbose_name='Полная ссылка',
-        unique=True,
-    )
-    short_link = models.URLField(
+    code = models.CharField(
+        verbose_name='Код ссылки',
+        max_length=constants.SHORT_LINK_CODE_MAX_LENGTH,
         unique=True,
     )
     recipe = models.OneToOneField(
@@ -94,7 +157,7 @@ class ShortLink(models.Model):
         ordering = ('id',)
 
     def __str__(self):
-        return self.short_link
+        return self.code
 
 
 class ShoppingCart(FavoriteShoppingCartMixin):
@@ -106,3 +169,63 @@ class ShoppingCart(FavoriteShoppingCartMixin):
 
     def __str__(self):
         return f'Рецепт {self.recipe} в корзине пользователя {self.user}'
+
+
+class RecipeRecommendation(models.Model):
+    """Похожий рецепт по совместным добавлениям в избранное и корзину.
+
+    Таблица заполняется командой build_recommendations.
+    """
+
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        verbose_name='Рецепт',
+        related_name='recommendations',
+    )
+    recommended = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        verbose_name='Рекомендуемый рецепт',
+        related_name='recommended_for',
+    )
+    score = models.FloatField(
+        verbose_name='Сходство',
+    )
+
+    class Meta:
+        verbose_name = 'Рекомендация'
+        verbose_name_plural = 'Рекомендации'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('recipe', 'recommended'),
+                name='unique_recipe_recommendation',
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=('recipe', '-score'),
+                name='recommendation_score_idx',
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.recommended} для {self.recipe}'
+
+
+class StaleRecommendation(models.Model):
+    """Рецепт, у которого изменились избранное или корзины после
+    последнего расчета рекомендаций.
+
+    Без внешнего ключа: отметка может остаться от удаленного рецепта,
+    такие id пропускаются при расчете.
+    """
+
+    recipe_id = models.PositiveBigIntegerField(
+        verbose_name='id рецепта',
+        primary_key=True,
+    )
+
+    class Meta:
+        verbose_name = 'Устаревшие рекомендации'
+        verbose_name_plural = 'Устаревшие рекомендации'
@@ -0,0 +1,128 @@
+"""Рекомендации «с этим рецептом также добавляют».
+
+Избранное и корзина каждого пользователя — две корзины рецептов.
+Сходство рецептов i и j — косинус их векторов по корзинам: число
+корзин с обоими рецептами / sqrt(n_i * n_j), где n — число корзин с
+рецептом, то есть favorites_count + shopping_carts_count. Матрица
+сходства целиком не строится: совместные вхождения для каждого рецепта
+считаются по разреженному индексу рецепт -> корзины, в таблице
+остаются RECOMMENDATIONS_TOP_K лучших соседей.
+"""
+import heapq
+import math
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import F
+
+from community.models import (
+    Favorite, RecipeRecommendation, ShoppingCart, StaleRecommendation
+)
+from foodgram_backend.constants import (
+    RECOMMENDATION_BATCH_SIZE, RECOMMENDATION_MAX_BASKET,
+    RECOMMENDATIONS_TOP_K
+)
+from recipes.models import Recipe
+
+INTERACTION_MODELS = (Favorite, ShoppingCart)
+
+
+def load_baskets(recipe_ids=None):
+    """Корзины {(вид, id пользователя): [id рецептов]}.
+
+    С recipe_ids загружаются только корзины с этими рецептами. Корзины
+    длиннее RECOMMENDATION_MAX_BASKET пропускаются: сигнала в них мало,
+    а стоимость расчета растет с квадратом длины корзины.
+    """
+    baskets = defaultdict(list)
+    for kind, model in enumerate(INTERACTION_MODELS):
+        rows = model.objects.all()
+        if recipe_ids is not None:
+            rows = rows.filter(user_id__in=model.objects.filter(
+                recipe_id__in=recipe_ids
+            ).values('user_id'))
+        for user_id, recipe_id in rows.values_list(
+            'user_id', 'recipe_id'
+        ).iterator():
+            baskets[kind, user_id].append(recipe_id)
+    return {
+        key: recipes for key, recipes in baskets.items()
+        if len(recipes) <= RECOMMENDATION_MAX_BASKET
+    }
+
+
+def get_neighbours(recipe_id, recipe_baskets, baskets, degrees, top_k):
+    """Пары (сходство, id рецепта) top_k соседей рецепта."""
+    co_occurrences = Counter()
+    for key in recipe_baskets.get(recipe_id, ()):
+        co_occurrences.update(baskets[key])
+    del co_occurrences[recipe_id]
+    degree = degrees.get(recipe_id, 0)
+    return heapq.nlargest(top_k, (
+        (
+            count / math.sqrt(
+                max(degree, count) * max(degrees.get(other, 0), count)
+            ),
+            other,
+        )
+        for other, count in co_occurrences.items()
+    ))
+
+
+def build_recommendations(recipe_ids=None, top_k=RECOMMENDATIONS_TOP_K,
+                          batch_size=RECOMMENDATION_BATCH_SIZE):
+    """Пересчитать рекомендации всех рецептов или только recipe_ids.
+
+    Рекомендации пишутся пачками по batch_size рецептов, каждая пачка
+    заменяется в своей транзакции. Возвращает число рецептов.
+    """
+    baskets = load_baskets(recipe_ids)
+    recipe_baskets = defaultdict(list)
+    for key, recipes in baskets.items():
+        for recipe_id in recipes:
+            recipe_baskets[recipe_id].append(key)
+
+    degrees = Recipe.objects.annotate(
+        degree=F('favorites_count') + F('shopping_carts_count')
+    ).values_list('id', 'degree')
+    targets = Recipe.objects.order_by('id').values_list('id', flat=True)
+    if recipe_ids is not None:
+        degrees = degrees.filter(pk__in=recipe_baskets)
+        targets = targets.filter(pk__in=recipe_ids)
+    else:
+        degrees = degrees.exclude(favorites_count=0, shopping_carts_count=0)
+    degrees = dict(degrees)
+    targets = list(targets)
+
+    for start in range(0, len(targets), batch_size):
+        batch = targets[start:start + batch_size]
+        with transaction.atomic():
+            RecipeRecommendation.objects.filter(recipe_id__in=batch).delete()
+            RecipeRecommendation.objects.bulk_create(
+                RecipeRecommendation(
+                    recipe_id=recipe_id, recommended_id=other, score=score
+                )
+                for recipe_id in batch
+                for score, other in get_neighbours(
+                    recipe_id, recipe_baskets, baskets, degrees, top_k
+                )
+            )
+    return len(targets)
+
+
+def refresh_stale_recommendations(**kwargs):
+    """Пересчитать рекомендации рецептов с отметкой StaleRecommendation."""
+    with transaction.atomic():
+        recipe_ids = list(
+            StaleRecommendation.objects.values_list('recipe_id', flat=True)
+        )
+        StaleRecommendation.objects.filter(recipe_id__in=recipe_ids).delete()
+    if not recipe_ids:
+        return 0
+    return build_recommendations(recipe_ids, **kwargs)
+
+
+def rebuild_recommendations(**kwargs):
+    """Пересчитать рекомендации всех рецептов."""
+    StaleRecommendation.objects.all().delete()
+    return build_recommendations(**kwargs)
@@ -0,0 +1,148 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest, Ln
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from community import feeds
+from community.models import (
+    FeedItem, Favorite, Follow, RecipeRecommendation, ShoppingCart,
+    StaleRecommendation
+)
+from foodgram_backend.constants import (
+    POPULARITY_CART_WEIGHT, POPULARITY_FAVORITE_WEIGHT,
+    RECOMMENDATION_MAX_BASKET
+)
+from recipes.models import Recipe
+
+User = get_user_model()
+
+POPULARITY_WEIGHTS = {
+    'favorites_count': POPULARITY_FAVORITE_WEIGHT,
+    'shopping_carts_count': POPULARITY_CART_WEIGHT,
+}
+
+
+def change_counter(model, pk, field_name, delta):
+    """Атомарно изменить счетчик через F(), не опускаясь ниже нуля."""
+    model.objects.filter(pk=pk).update(
+        **{field_name: Greatest(F(field_name) + delta, Value(0))}
+    )
+
+
+def change_recipe_counter(pk, field_name, delta):
+    """Изменить счетчик рецепта вместе с popularity и trending_score.
+
+    trending_score хранит ln(1 + popularity) плюс слагаемое давности,
+    поэтому меняется на разность логарифмов старой и новой популярности.
+    """
+    popularity = Greatest(
+        F('popularity') + delta * POPULARITY_WEIGHTS[field_name], Value(0)
+    )
+    Recipe.objects.filter(pk=pk).update(
+        **{field_name: Greatest(F(field_name) + delta, Value(0))},
+        popularity=popularity,
+        trending_score=(
+            F('trending_score') - Ln(F('popularity') + 1)
+            + Ln(popularity + 1)
+        ),
+    )
+
+
+@receiver(post_save, sender=Favorite)
+def increment_favorites_count(instance, created, **kwargs):
+    if created:
+        change_recipe_counter(instance.recipe_id, 'favorites_count', 1)
+
+
+@receiver(post_delete, sender=Favorite)
+def decrement_favorites_count(instance, **kwargs):
+    change_recipe_counter(instance.recipe_id, 'favorites_count', -1)
+
+
+@receiver(post_save, sender=ShoppingCart)
+def increment_shopping_carts_count(instance, created, **kwargs):
+    if created:
+        change_recipe_counter(instance.recipe_id, 'shopping_carts_count', 1)
+
+
+@receiver(post_delete, sender=ShoppingCart)
+def decrement_shopping_carts_count(instance, **kwargs):
+    change_recipe_counter(instance.recipe_id, 'shopping_carts_count', -1)
+
+
+@receiver(post_save, sender=Follow)
+def increment_followers_count(instance, created, **kwargs):
+    if created:
+        change_counter(User, instance.following_id, 'followers_count', 1)
+
+
+@receiver(post_delete, sender=Follow)
+def decrement_followers_count(instance, **kwargs):
+    change_counter(User, instance.following_id, 'followers_count', -1)
+
+
+@receiver(post_save, sender=Recipe)
+def increment_recipes_count(instance, created, **kwargs):
+    if created:
+        change_counter(User, instance.author_id, 'recipes_count', 1)
+
+
+@receiver(post_delete, sender=Recipe)
+def decrement_recipes_count(instance, **kwargs):
+    change_counter(User, instance.author_id, 'recipes_count', -1)
+
+
+@receiver(post_save, sender=Recipe)
+def fan_out_recipe(instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: feeds.fan_out([instance]))
+
+
+@receiver(post_save, sender=Follow)
+def backfill_feed(instance, created, **kwargs):
+    if created:
+        feeds.backfill(instance.user_id, instance.following_id)
+
+
+@receiver(post_delete, sender=Follow)
+def clear_feed(instance, **kwargs):
+    FeedItem.objects.filter(
+        user_id=instance.user_id, author_id=instance.following_id
+    ).delete()
+
+
+@receiver((post_save, post_delete), sender=Favorite)
+@receiver((post_save, post_delete), sender=ShoppingCart)
+def mark_recommendations_stale(sender, instance, **kwargs):
+    """Отметить устаревшими рецепт, рецепты из той же корзины и рецепты,
+    которым он уже рекомендован.
+
+    Совместные вхождения симметричны: изменение корзины меняет сходство
+    рецепта со всеми рецептами в ней, а изменение числа корзин рецепта —
+    его сходство с прежними соседями. Рецепт, который после удаления
+    из корзины вошел бы в топ чужих рекомендаций, появится там только
+    при полном пересчете. Корзины длиннее RECOMMENDATION_MAX_BASKET в
+    расчет не входят.
+    """
+    basket = list(
+        sender.objects.filter(user_id=instance.user_id).values_list(
+            'recipe_id', flat=True
+        )[:RECOMMENDATION_MAX_BASKET + 2]
+    )
+    if len(basket) > RECOMMENDATION_MAX_BASKET + 1:
+        basket = []
+    StaleRecommendation.objects.bulk_create(
+        (
+            StaleRecommendation(recipe_id=recipe_id)
+            for recipe_id in {
+                instance.recipe_id,
+                *basket,
+                *RecipeRecommendation.objects.filter(
+                    recommended_id=instance.recipe_id
+                ).values_list('recipe_id', flat=True),
+            }
+        ),
+        ignore_conflicts=True,
+    )
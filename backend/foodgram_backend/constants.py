@@ -8,7 +8,13 @@ COOKING_TIME_MIN = 1
 
 COOKING_TIME_MAX = 32000
 
-DIGEST_SIZE = 3
+SHORT_LINK_ALPHABET = (
+    '0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ'
+)
+
+SHORT_LINK_CODE_MAX_LENGTH = 16
+
+SHORT_LINK_CACHE_TIMEOUT = 60 * 60 * 24
 
 TAG_MAX_LENGTH = 100
 
@@ -27,3 +33,64 @@ EMAIL_LENGTH = 254
 PAGE_SIZE = 6
 
 MODEL_NAME_LENGTH = 100
+
+SHOPPING_LIST_FILENAME = 'shopping_list'
+
+SHOPPING_LIST_CACHE_TIMEOUT = 60 * 60 * 24
+
+SHOPPING_LIST_CACHE_MAX_ROWS = 500
+
+INGREDIENTS_IMPORT_BATCH_SIZE = 5000
+
+INGREDIENT_SEARCH_LIMIT = 50
+
+INGREDIENT_SUBSTRING_SEARCH_MIN_LENGTH = 3
+
+INGREDIENT_CATALOGUE_MAX_SIZE = 50000
+
+CATALOGUE_CACHE_MAX_AGE = 60
+
+SYNTHETIC_DATA_BATCH_SIZE = 1000
+
+BENCHMARK_ITERATIONS = 30
+
+IMAGE_VARIANTS_DIR = 'variants'
+
+IMAGE_VARIANT_QUALITY = 80
+
+IMAGE_SIZES = {'small': 160, 'medium': 480, 'large': 1200}
+
+RECIPE_IMAGE_WIDTHS = tuple(IMAGE_SIZES.values())
+
+AVATAR_IMAGE_WIDTHS = (256,)
+
+RECIPE_BULK_BATCH_SIZE = 1000
+
+RECIPE_IMPORT_MAX_ERRORS = 100
+
+RECIPE_IMPORT_MAX_RECORDS = 2000
+
+RECIPE_EXPORT_FILENAME = 'recipes'
+
+RECIPE_SEARCH_CONFIG = 'russian'
+
+PANTRY_MAX_INGREDIENTS = 100
+PANTRY_MAX_CANDIDATES = 5000
+
+FEED_BACKFILL_RECIPES = 100
+
+FEED_BATCH_SIZE = 1000
+
+RECOMMENDATIONS_TOP_K = 10
+
+RECOMMENDATION_MAX_BASKET = 500
+
+RECOMMENDATION_BATCH_SIZE = 1000
+
+POPULARITY_FAVORITE_WEIGHT = 2
+
+POPULARITY_CART_WEIGHT = 1
+
+TRENDING_HALF_LIFE_HOURS = 72
+
+POPULARITY_BATCH_SIZE = 1000
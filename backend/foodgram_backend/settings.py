@@ -35,6 +35,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'api.profiling.QueryProfilingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -74,6 +75,21 @@ DATABASES = {
     }
 }
 
+# Версии кэша общие для всех воркеров и процессов обработки изображений,
+# поэтому по умолчанию нужен общий кэш. LocMemCache — только для одного
+# процесса при DEBUG.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', (
+            'django.core.cache.backends.locmem.LocMemCache' if DEBUG
+            else 'django.core.cache.backends.memcached.PyMemcacheCache'
+        )),
+        'LOCATION': os.getenv(
+            'CACHE_LOCATION', '' if DEBUG else 'memcached:11211'
+        ),
+    }
+}
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -137,4 +153,33 @@ DJOSER = {
     },
 }
 
+QUERY_PROFILING = os.getenv('QUERY_PROFILING', str(DEBUG)).lower() == 'true'
+QUERY_BUDGET_ENFORCE = (
+    os.getenv('QUERY_BUDGET_ENFORCE', 'False').lower() == 'true'
+)
+
+IMAGE_PROCESSING_WORKERS = int(os.getenv('IMAGE_PROCESSING_WORKERS', 1))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'foodgram.profiling': {
+            'handlers': ['console'],
+            'level': 'INFO' if QUERY_PROFILING else 'WARNING',
+            'propagate': False,
+        },
+        'foodgram.images': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
 PATH_TO_INGREDIENTS = BASE_DIR / 'data/ingredients.json'
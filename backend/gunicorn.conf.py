@@ -0,0 +1,76 @@
+"""Настройки gunicorn.
+
+SERVER_MODE=wsgi — синхронные воркеры gthread на foodgram_backend.wsgi.
+SERVER_MODE=asgi — воркеры uvicorn на foodgram_backend.asgi: тело
+запроса (например, загрузка изображения) читается асинхронно, и
+медленный клиент не занимает воркер. Django 3.2 выполняет синхронные
+представления под ASGI в одном потоке на воркер, поэтому параллельность
+режима asgi задается только числом воркеров.
+"""
+import math
+import os
+
+SERVER_MODE = os.getenv('SERVER_MODE', 'wsgi').lower()
+
+
+def get_cpu_limit():
+    """Число CPU с учетом квоты cgroup контейнера.
+
+    os.cpu_count() в контейнере возвращает число CPU хоста.
+    """
+    cpus = len(os.sched_getaffinity(0))
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as cpu_max:
+            quota, period = cpu_max.read().split()
+    except OSError:
+        try:
+            with open('/sys/fs/cgroup/cpu/cpu.cfs_quota_us') as quota_file:
+                quota = quota_file.read().strip()
+            with open('/sys/fs/cgroup/cpu/cpu.cfs_period_us') as period_file:
+                period = period_file.read().strip()
+        except OSError:
+            return cpus
+    if quota in ('max', '-1'):
+        return cpus
+    return max(1, min(cpus, math.ceil(int(quota) / int(period))))
+
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+# Каждый воркер запускает еще IMAGE_PROCESSING_WORKERS процессов Django
+# для обработки изображений (api.images): всего процессов
+# workers * (1 + IMAGE_PROCESSING_WORKERS).
+workers = int(os.getenv('WEB_CONCURRENCY', get_cpu_limit() * 2 + 1))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+
+if SERVER_MODE == 'asgi':
+    wsgi_app = 'foodgram_backend.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+elif SERVER_MODE == 'wsgi':
+    wsgi_app = 'foodgram_backend.wsgi:application'
+    worker_class = 'gthread'
+    threads = int(os.getenv('GUNICORN_THREADS', 4))
+else:
+    raise ValueError(f'Неизвестный SERVER_MODE: {SERVER_MODE}')
+
+
+def on_starting(server):
+    """Не запускаться с кэшем в памяти процесса, если процессов несколько.
+
+    Версии кэша меняют все воркеры и процессы обработки изображений.
+    """
+    os.environ.setdefault(
+        'DJANGO_SETTINGS_MODULE', 'foodgram_backend.settings'
+    )
+    from django.conf import settings
+    from django.core.exceptions import ImproperlyConfigured
+
+    backend = settings.CACHES['default']['BACKEND']
+    if backend.endswith('.LocMemCache') and (
+        server.cfg.workers > 1 or settings.IMAGE_PROCESSING_WORKERS
+    ):
+        raise ImproperlyConfigured(
+            'LocMemCache не разделяется между процессами: задайте общий '
+            'CACHE_BACKEND или WEB_CONCURRENCY=1 и '
+            'IMAGE_PROCESSING_WORKERS=0.'
+        )
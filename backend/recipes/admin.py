@@ -37,9 +37,13 @@ class RecipeAdmin(admin.ModelAdmin):
     )
     filter_horizontal = ('tags',)
 
-    @admin.display(description='Количество добавлений в избранное')
-    def favorites_count(self, recipe):
-        return recipe.user_favorite.count()
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        recipe = Recipe.objects.filter(pk=form.instance.pk)
+        recipe.update(
+            ingredients_count=form.instance.recipe_ingredients.count()
+        )
+        recipe.update_search_vector()
 
 
 @admin.register(Tag)
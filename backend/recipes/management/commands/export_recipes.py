@@ -0,0 +1,46 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from api.bulk import export_records
+from api.renderers import CSVRecipeRenderer, NDJSONRecipeRenderer
+from foodgram_backend.constants import RECIPE_BULK_BATCH_SIZE
+
+RENDERERS = {
+    renderer.format: renderer
+    for renderer in (NDJSONRecipeRenderer, CSVRecipeRenderer)
+}
+
+
+class Command(BaseCommand):
+    """Потоковый экспорт рецептов."""
+
+    help = (
+        'Выгружает все рецепты в NDJSON или CSV в формате, который '
+        'принимает import_recipes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?', help='Файл результата, по умолчанию stdout.',
+        )
+        parser.add_argument(
+            '--format', choices=tuple(RENDERERS), default='ndjson',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=RECIPE_BULK_BATCH_SIZE,
+        )
+
+    def handle(self, *args, **options):
+        renderer = RENDERERS[options['format']]()
+        output = (
+            open(options['path'], 'w', encoding='UTF-8', newline='')
+            if options['path'] else sys.stdout
+        )
+        try:
+            output.writelines(
+                renderer.stream(export_records(options['batch_size']))
+            )
+        finally:
+            if output is not sys.stdout:
+                output.close()
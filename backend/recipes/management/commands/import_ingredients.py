@@ -1,25 +1,162 @@
+import csv
+import io
 import json
+from itertools import islice
+from pathlib import Path
 
 from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
 from tqdm import tqdm
 
+from api.cache import INGREDIENTS, bump_catalogue_version
+from foodgram_backend.constants import INGREDIENTS_IMPORT_BATCH_SIZE
 from foodgram_backend.settings import PATH_TO_INGREDIENTS
 from recipes.models import Ingredient
 
+UNIQUE_CONSTRAINT = 'ingredients_uniques'
+CSV_HEADER = ['name', 'measurement_unit']
+
 
 class Command(BaseCommand):
     """Заполнение базы ингридиентами"""
 
-    def handle(self, *args, **options):
+    help = (
+        'Импорт ингредиентов из CSV (name,measurement_unit, строка '
+        'заголовка необязательна), JSON или NDJSON. Повторный импорт '
+        'пропускает существующие записи.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            nargs='?',
+            default=PATH_TO_INGREDIENTS,
+            help='Путь к файлу .csv, .json, .jsonl или .ndjson.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=INGREDIENTS_IMPORT_BATCH_SIZE,
+        )
+        parser.add_argument(
+            '--method',
+            choices=('copy', 'bulk'),
+            default='copy',
+            help=(
+                'copy (по умолчанию) — COPY во временную таблицу и '
+                'INSERT ... ON CONFLICT, bulk — bulk_create.'
+            ),
+        )
 
-        with open(PATH_TO_INGREDIENTS, encoding='UTF-8') as ingredients_file:
-            ingredients = json.load(ingredients_file)
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        if not path.is_file():
+            raise CommandError(f'Файл {path} не найден')
+        method = options['method']
 
-            for ingredient in tqdm(ingredients):
-                try:
-                    Ingredient.objects.get_or_create(**ingredient)
-                except CommandError as e:
-                    raise CommandError(
-                        f'При добавлении {ingredient} '
-                        f'произшла ошибка {e}'
+        with open(path, encoding='UTF-8', newline='') as ingredients_file:
+            rows = tqdm(self.read_rows(path, ingredients_file), unit=' шт.')
+            with transaction.atomic():
+                if method == 'copy':
+                    total, inserted = self.copy_rows(
+                        rows, options['batch_size']
+                    )
+                else:
+                    total, inserted = self.bulk_create_rows(
+                        rows, options['batch_size']
                     )
+        if inserted:
+            bump_catalogue_version(INGREDIENTS)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано: {total}, добавлено: {inserted}, '
+            f'пропущено: {total - inserted}'
+        ))
+
+    def read_rows(self, path, ingredients_file):
+        suffix = path.suffix.lower()
+        if suffix == '.csv':
+            records = csv.reader(ingredients_file)
+        elif suffix in ('.jsonl', '.ndjson'):
+            records = (
+                json.loads(line) for line in ingredients_file if line.strip()
+            )
+        elif suffix == '.json':
+            records = json.load(ingredients_file)
+        else:
+            raise CommandError(f'Неподдерживаемый формат файла: {suffix}')
+
+        for number, record in enumerate(records, start=1):
+            if not record:
+                continue
+            if number == 1 and suffix == '.csv' and [
+                value.strip().lower() for value in record
+            ] == CSV_HEADER:
+                continue
+            try:
+                if isinstance(record, dict):
+                    name = record['name']
+                    measurement_unit = record['measurement_unit']
+                else:
+                    name, measurement_unit = record
+            except (KeyError, TypeError, ValueError):
+                raise CommandError(
+                    f'Запись {number}: ожидаются поля name и measurement_unit'
+                )
+            yield self.clean_row(number, name, measurement_unit)
+
+    def clean_row(self, number, name, measurement_unit):
+        row = (str(name).strip(), str(measurement_unit).strip())
+        for field_name, value in zip(('name', 'measurement_unit'), row):
+            max_length = Ingredient._meta.get_field(field_name).max_length
+            if not value or len(value) > max_length:
+                raise CommandError(
+                    f'Запись {number}: некорректное значение '
+                    f'{field_name} {value!r}'
+                )
+        return row
+
+    def batches(self, rows, batch_size):
+        rows = iter(rows)
+        while batch := list(islice(rows, batch_size)):
+            yield batch
+
+    def bulk_create_rows(self, rows, batch_size):
+        total = 0
+        count_before = Ingredient.objects.count()
+        for batch in self.batches(rows, batch_size):
+            Ingredient.objects.bulk_create(
+                (
+                    Ingredient(name=name, measurement_unit=measurement_unit)
+                    for name, measurement_unit in batch
+                ),
+                ignore_conflicts=True,
+            )
+            total += len(batch)
+        return total, Ingredient.objects.count() - count_before
+
+    def copy_rows(self, rows, batch_size):
+        total = 0
+        table = connection.ops.quote_name(Ingredient._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE TEMPORARY TABLE ingredients_import '
+                '(name text, measurement_unit text) ON COMMIT DROP'
+            )
+            for batch in self.batches(rows, batch_size):
+                buffer = io.StringIO()
+                csv.writer(buffer).writerows(batch)
+                buffer.seek(0)
+                cursor.copy_expert(
+                    'COPY ingredients_import (name, measurement_unit) '
+                    'FROM STDIN WITH (FORMAT csv)',
+                    buffer,
+                )
+                total += len(batch)
+            cursor.execute(
+                f'INSERT INTO {table} (name, measurement_unit) '
+                'SELECT DISTINCT name, measurement_unit '
+                'FROM ingredients_import '
+                f'ON CONFLICT ON CONSTRAINT {UNIQUE_CONSTRAINT} DO NOTHING'
+            )
+            return total, cursor.rowcount
@@ -0,0 +1,50 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from tqdm import tqdm
+
+from api.bulk import RecipeImporter, read_records
+from foodgram_backend.constants import RECIPE_BULK_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    """Массовый импорт рецептов."""
+
+    help = (
+        'Импорт рецептов из NDJSON или CSV пачками через bulk_create. '
+        'Рецепты, название которых уже есть у автора, пропускаются. '
+        'Изображение задается именем файла в MEDIA_ROOT или путем к '
+        'локальному файлу.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл .ndjson, .jsonl или .csv.')
+        parser.add_argument(
+            '--batch-size', type=int, default=RECIPE_BULK_BATCH_SIZE,
+        )
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        if not path.is_file():
+            raise CommandError(f'Файл {path} не найден')
+        format = 'csv' if path.suffix.lower() == '.csv' else 'ndjson'
+
+        importer = RecipeImporter(
+            batch_size=options['batch_size'], allow_local_files=True
+        )
+        with open(path, encoding='UTF-8', newline='') as recipes_file:
+            result = importer.run(
+                tqdm(read_records(recipes_file, format), unit=' шт.')
+            )
+
+        for error in result['errors']:
+            self.stderr.write(
+                f'Строка {error["line"]}: {"; ".join(error["errors"])}'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано: {result["processed"]}, '
+            f'добавлено: {result["created"]}, '
+            f'пропущено: {result["skipped"]}, '
+            f'с ошибками: {result["failed"]}. Варианты изображений '
+            'создаст команда process_images.'
+        ))
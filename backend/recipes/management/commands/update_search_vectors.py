@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    """Пересчет поисковых векторов рецептов."""
+
+    help = (
+        'Пересчитывает поисковые векторы всех рецептов, например после '
+        'изменения рецептов напрямую в базе.'
+    )
+
+    def handle(self, *args, **options):
+        updated = Recipe.objects.all().update_search_vector()
+        self.stdout.write(self.style.SUCCESS(
+            f'Обновлено поисковых векторов: {updated}'
+        ))
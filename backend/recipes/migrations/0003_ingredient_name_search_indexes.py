@@ -0,0 +1,27 @@
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0002_initial'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.RunSQL(
+            sql=(
+                'CREATE INDEX ingredient_name_upper_prefix_idx '
+                'ON recipes_ingredient (UPPER(name) text_pattern_ops);'
+            ),
+            reverse_sql='DROP INDEX ingredient_name_upper_prefix_idx;',
+        ),
+        migrations.RunSQL(
+            sql=(
+                'CREATE INDEX ingredient_name_upper_trgm_idx '
+                'ON recipes_ingredient USING gin (UPPER(name) gin_trgm_ops);'
+            ),
+            reverse_sql='DROP INDEX ingredient_name_upper_trgm_idx;',
+        ),
+    ]
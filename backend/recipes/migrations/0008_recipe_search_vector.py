@@ -0,0 +1,36 @@
+# Generated by Django 3.2 on 2026-10-18 02:51
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+from recipes.search import update_search_vectors
+
+
+def fill_search_vectors(apps, schema_editor):
+    update_search_vectors(
+        apps.get_model('recipes', 'Recipe').objects.all(),
+        apps.get_model('recipes', 'RecipeIngredient'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_recipe_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Поисковый вектор'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='recipe_search_vector_idx'),
+        ),
+        migrations.RunPython(
+            fill_search_vectors, migrations.RunPython.noop
+        ),
+    ]
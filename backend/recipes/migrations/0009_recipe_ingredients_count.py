@@ -0,0 +1,30 @@
+# Generated by Django 3.2 on 2026-10-18 02:53
+
+from django.db import migrations, models
+
+from community.counters import recompute_ingredients_counts
+
+
+def fill_ingredients_counts(apps, schema_editor):
+    recompute_ingredients_counts(
+        apps.get_model('recipes', 'Recipe'),
+        apps.get_model('recipes', 'RecipeIngredient'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_recipe_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='ingredients_count',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, verbose_name='Количество ингредиентов'),
+        ),
+        migrations.RunPython(
+            fill_ingredients_counts, migrations.RunPython.noop
+        ),
+    ]
@@ -1,12 +1,42 @@
+import math
+
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.db import models
+from django.utils import timezone
 
 from foodgram_backend import constants
+from recipes.search import update_search_vectors
 
 User = get_user_model()
 
 
+def get_popularity(favorites_count, shopping_carts_count):
+    return (
+        constants.POPULARITY_FAVORITE_WEIGHT * favorites_count
+        + constants.POPULARITY_CART_WEIGHT * shopping_carts_count
+    )
+
+
+def get_trending_score(popularity, created_at):
+    """Логарифм популярности, затухающей с возрастом рецепта.
+
+    (1 + popularity) * 2 ** (-age / half_life) в логарифме дает
+    ln(1 + popularity) + created_at / tau - now / tau. Последнее
+    слагаемое одинаково для всех рецептов, поэтому хранится только
+    остальное: значение меняется лишь вместе с популярностью, и его не
+    нужно пересчитывать по расписанию.
+    """
+    tau = constants.TRENDING_HALF_LIFE_HOURS * 3600 / math.log(2)
+    return math.log1p(popularity) + created_at.timestamp() / tau
+
+
+def get_initial_trending_score():
+    return get_trending_score(0, timezone.now())
+
+
 class Tag(models.Model):
     name = models.CharField(
         verbose_name='Name',
@@ -51,6 +81,12 @@ class Ingredient(models.Model):
         return f'{self.name}, {self.measurement_unit}.'
 
 
+class RecipeQuerySet(models.QuerySet):
+    def update_search_vector(self):
+        """Обновить поисковый вектор после изменения рецептов."""
+        return update_search_vectors(self, RecipeIngredient)
+
+
 class Recipe(models.Model):
     name = models.CharField(
         verbose_name='Название рецепта',
@@ -61,6 +97,11 @@ class Recipe(models.Model):
         'Изображение',
         upload_to='recipes/',
     )
+    image_variants = models.JSONField(
+        verbose_name='Обработанные варианты изображения',
+        default=dict,
+        editable=False,
+    )
     text = models.TextField(
         'Описание рецепта',
     )
@@ -91,11 +132,65 @@ class Recipe(models.Model):
         verbose_name='Дата публикации',
         auto_now_add=True,
     )
+    updated_at = models.DateTimeField(
+        verbose_name='Дата изменения',
+        auto_now=True,
+    )
+    favorites_count = models.PositiveIntegerField(
+        verbose_name='Количество добавлений в избранное',
+        default=0,
+        editable=False,
+    )
+    shopping_carts_count = models.PositiveIntegerField(
+        verbose_name='Количество добавлений в корзину',
+        default=0,
+        editable=False,
+    )
+    ingredients_count = models.PositiveSmallIntegerField(
+        verbose_name='Количество ингредиентов',
+        default=0,
+        editable=False,
+    )
+    popularity = models.PositiveIntegerField(
+        verbose_name='Популярность',
+        default=0,
+        editable=False,
+    )
+    trending_score = models.FloatField(
+        verbose_name='Популярность с учетом давности',
+        default=get_initial_trending_score,
+        editable=False,
+    )
+    search_vector = SearchVectorField(
+        verbose_name='Поисковый вектор',
+        null=True,
+        editable=False,
+    )
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
         ordering = ('-created_at',)
+        indexes = (
+            models.Index(
+                fields=('-created_at', '-id'),
+                name='recipe_created_at_id_idx',
+            ),
+            models.Index(
+                fields=('-popularity', '-id'),
+                name='recipe_popularity_id_idx',
+            ),
+            models.Index(
+                fields=('-trending_score', '-id'),
+                name='recipe_trending_score_id_idx',
+            ),
+            GinIndex(
+                fields=('search_vector',),
+                name='recipe_search_vector_idx',
+            ),
+        )
 
 
 class RecipeIngredient(models.Model):
@@ -0,0 +1,33 @@
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchVector
+from django.db.models import OuterRef, Subquery, TextField
+
+from foodgram_backend.constants import RECIPE_SEARCH_CONFIG
+
+
+def recipe_search_vector(recipe_ingredient_model):
+    """Выражение tsvector рецепта: название (вес A), названия
+    ингредиентов (B) и описание (C) в русской конфигурации.
+    """
+    ingredient_names = Subquery(
+        recipe_ingredient_model.objects.filter(recipe=OuterRef('pk'))
+        .order_by()
+        .values('recipe')
+        .annotate(names=StringAgg('ingredient__name', ' '))
+        .values('names'),
+        output_field=TextField(),
+    )
+    return (
+        SearchVector('name', weight='A', config=RECIPE_SEARCH_CONFIG)
+        + SearchVector(
+            ingredient_names, weight='B', config=RECIPE_SEARCH_CONFIG
+        )
+        + SearchVector('text', weight='C', config=RECIPE_SEARCH_CONFIG)
+    )
+
+
+def update_search_vectors(recipes, recipe_ingredient_model):
+    """Пересчитать search_vector рецептов одним UPDATE."""
+    return recipes.update(
+        search_vector=recipe_search_vector(recipe_ingredient_model)
+    )